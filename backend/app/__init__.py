@@ -53,13 +53,16 @@ def create_app():
     grpc_server, grpc_servicer = start_grpc_server(grpc_port)
     logger.info(f"gRPC server started on port {grpc_port}")
     
-    # Start ping monitor service
-    ping_monitor.start()
+    # Start ping monitor service on the servicer's storage
+    ping_monitor.start(grpc_servicer.storage)
     logger.info("Agent ping monitor service started")
     
     elastalert_client = ElastAlertClient(grpc_servicer)
     app.config['elastalert_client'] = elastalert_client
     
+    # Routes read agents from the servicer's memory, which is ahead of agents.json
+    app.config['agent_storage'] = grpc_servicer.storage
+    
     # Register API blueprints
     from app.api.routes.rules import rules_bp
     from app.api.routes.agents import agents_bp
@@ -153,6 +156,7 @@ def shutdown_background_threads():
         if hasattr(grpc_servicer, 'storage'):
             logger.info("Saving pending agent data...")
             grpc_servicer.storage.force_save()
+            grpc_servicer.flush_command_results()
             
         grpc_server.stop(grace=5)
         logger.info("gRPC server stopped")
@@ -4,6 +4,8 @@ import json
 import time
 from flask import Blueprint, jsonify, request, current_app
 from app.config.config import config
+from app.storage import read_ioc_matches
+from app.utils.agent_commands import load_agents
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -15,19 +17,11 @@ agents_bp = Blueprint('agents', __name__, url_prefix='/api/agents')
 def get_agents():
     """Get all registered agents."""
     try:
-        # Path to the agents.json file
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        agents_file = os.path.join(data_dir, 'agents.json')
-        
-        logger.info(f"Loading agents from {agents_file}")
-        
-        if not os.path.exists(agents_file):
-            logger.warning(f"Agents file not found at {agents_file}")
+        agents_data = load_agents()
+        if agents_data is None:
+            logger.warning("No agent data found")
             return jsonify([])
         
-        with open(agents_file, 'r') as f:
-            agents_data = json.load(f)
-        
         # Convert dictionary to list and add 'id' field for frontend compatibility
         # No need for timeout checking - ping monitor service handles this
         agents_list = []
@@ -88,17 +82,11 @@ def get_agents():
 def get_agent(agent_id):
     """Get agent by ID."""
     try:
-        # Path to the agents.json file
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        agents_file = os.path.join(data_dir, 'agents.json')
-        
-        if not os.path.exists(agents_file):
-            logger.warning(f"Agents file not found at {agents_file}")
+        agents_data = load_agents()
+        if agents_data is None:
+            logger.warning("No agent data found")
             return jsonify({"error": "Agent not found"}), 404
         
-        with open(agents_file, 'r') as f:
-            agents_data = json.load(f)
-        
         agent = agents_data.get(agent_id)
         
         if not agent:
@@ -156,18 +144,12 @@ def get_agent(agent_id):
 def get_agent_ioc_matches(agent_id):
     """Get IOC matches for a specific agent."""
     try:
-        # Path to the IOC matches file
+        # IOC matches live in ioc_matches.json plus the log of matches since its last compaction
         data_dir = os.path.join(current_app.root_path, '..', 'data')
-        ioc_matches_file = os.path.join(data_dir, 'ioc_matches.json')
         
-        logger.info(f"Loading IOC matches from {ioc_matches_file}")
-        
-        if not os.path.exists(ioc_matches_file):
-            logger.warning(f"IOC matches file not found at {ioc_matches_file}")
-            return jsonify([])
+        logger.info(f"Loading IOC matches from {data_dir}")
         
-        with open(ioc_matches_file, 'r') as f:
-            all_matches = json.load(f)
+        all_matches = read_ioc_matches(data_dir)
         
         # Check if all_matches is a dictionary (new format) or list (old format)
         if isinstance(all_matches, dict):
@@ -7,11 +7,16 @@ import grpc
 from flask import Blueprint, jsonify, request, current_app
 from app.grpc import agent_pb2, agent_pb2_grpc
 from app.config.config import config
-from app.utils.agent_commands import create_grpc_client, send_command_to_agent, get_online_agents
+from app.utils.agent_commands import create_grpc_client, send_command_to_agent, get_online_agents, load_agents
+from app.storage import read_command_results
 
 # Set up logger
 logger = logging.getLogger(__name__)
 
+# Command type lookups, built once from the proto enum
+COMMAND_TYPE_NAMES = {v.number: v.name for v in agent_pb2.CommandType.DESCRIPTOR.values}
+COMMAND_TYPE_VALUES = {name: number for number, name in COMMAND_TYPE_NAMES.items()}
+
 # Create commands routes blueprint
 commands_bp = Blueprint('commands', __name__, url_prefix='/api/commands')
 
@@ -29,8 +34,7 @@ def get_commands():
             logger.warning(f"Command results file not found at {results_file}")
             return jsonify([])
         
-        with open(results_file, 'r') as f:
-            results_data = json.load(f)
+        results_data = read_command_results(data_dir)
         
         # Convert dictionary to list and format for frontend
         results_list = []
@@ -67,8 +71,7 @@ def get_command(command_id):
             logger.warning(f"Command results file not found at {results_file}")
             return jsonify({"error": "Command not found"}), 404
         
-        with open(results_file, 'r') as f:
-            results_data = json.load(f)
+        results_data = read_command_results(data_dir)
         
         result = results_data.get(command_id)
         
@@ -117,15 +120,10 @@ def send_command():
             return jsonify({"error": "Invalid command type"}), 400
         
         # Verify the agent exists
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        agents_file = os.path.join(data_dir, 'agents.json')
-        
-        if not os.path.exists(agents_file):
+        agents_data = load_agents()
+        if agents_data is None:
             return jsonify({"error": "No agents are registered"}), 400
             
-        with open(agents_file, 'r') as f:
-            agents_data = json.load(f)
-            
         if agent_id not in agents_data:
             return jsonify({"error": f"Agent with ID {agent_id} does not exist"}), 404
         
@@ -207,29 +205,8 @@ def send_command():
 
 def convert_command_type_to_string(type_value):
     """Convert command type enum to string."""
-    command_types = {
-        0: "UNKNOWN",
-        1: "DELETE_FILE",
-        2: "KILL_PROCESS",
-        3: "KILL_PROCESS_TREE",
-        4: "BLOCK_IP",
-        5: "BLOCK_URL",
-        6: "NETWORK_ISOLATE",
-        7: "NETWORK_RESTORE",
-        8: "UPDATE_IOCS"
-    }
-    return command_types.get(type_value, "UNKNOWN")
+    return COMMAND_TYPE_NAMES.get(type_value, "UNKNOWN")
 
 def convert_command_type_from_string(type_string):
     """Convert command type string to enum value."""
-    command_types = {
-        "DELETE_FILE": 1,
-        "KILL_PROCESS": 2,
-        "KILL_PROCESS_TREE": 3,
-        "BLOCK_IP": 4,
-        "BLOCK_URL": 5,
-        "NETWORK_ISOLATE": 6,
-        "NETWORK_RESTORE": 7,
-        "UPDATE_IOCS": 8
-    }
-    return command_types.get(type_string, 0) 
\ No newline at end of file
+    return COMMAND_TYPE_VALUES.get(type_string, 0) 
\ No newline at end of file
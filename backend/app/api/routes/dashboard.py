@@ -5,6 +5,7 @@ import os
 import json
 import time
 from app.config.config import config
+from app.utils.agent_commands import load_agents
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -35,21 +36,16 @@ def get_dashboard_stats():
         
         # Get active agents count
         active_agents = 0
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        agents_file = os.path.join(data_dir, 'agents.json')
-        
-        if os.path.exists(agents_file):
-            try:
-                with open(agents_file, 'r') as f:
-                    agents_data = json.load(f)
-                    
-                    # Simply count active agents without timeout checking
-                    # Ping monitor service handles timeout checking now
-                    active_agents = sum(1 for agent in agents_data.values() if agent.get('status') == 'ONLINE')
-                    logger.info(f"Found {active_agents} active agents")
-                    
-            except Exception as e:
-                logger.error(f"Error reading agents file: {str(e)}")
+        try:
+            agents_data = load_agents()
+            if agents_data:
+                # Simply count active agents without timeout checking
+                # Ping monitor service handles timeout checking now
+                active_agents = sum(1 for agent in agents_data.values() if agent.get('status') == 'ONLINE')
+                logger.info(f"Found {active_agents} active agents")
+                
+        except Exception as e:
+            logger.error(f"Error reading agents file: {str(e)}")
         
         stats = {
             'total_alerts': total_alerts,
@@ -183,17 +179,11 @@ def get_agent_stats():
     try:
         logger.info("Getting agent statistics")
         
-        # Path to the agents.json file
-        data_dir = os.path.join(current_app.root_path, '..', 'data')
-        agents_file = os.path.join(data_dir, 'agents.json')
-        
-        if not os.path.exists(agents_file):
-            logger.warning(f"Agents file not found at {agents_file}")
+        agents_data = load_agents()
+        if agents_data is None:
+            logger.warning("No agent data found")
             return jsonify({'agents': []})
         
-        with open(agents_file, 'r') as f:
-            agents_data = json.load(f)
-        
         # Convert dictionary to list and add 'id' field for frontend compatibility
         # No need for timeout checking - ping monitor service handles this
         agents_list = []
@@ -2,7 +2,7 @@ import os
 import json
 import logging
 import time
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from app.iocs import IOCManager
 
 # Configure logging
@@ -18,8 +18,8 @@ ioc_manager = IOCManager()
 def get_all_iocs():
     """Get all IOCs in the system."""
     try:
-        result = ioc_manager.get_all_iocs()
-        return jsonify(result)
+        # Serialized once per change instead of on every poll
+        return Response(ioc_manager.get_all_iocs_json(), mimetype='application/json')
     except Exception as e:
         logger.error(f"Error retrieving IOCs: {str(e)}")
         return jsonify({"error": f"Failed to retrieve IOCs: {str(e)}"}), 500
@@ -56,9 +56,6 @@ def add_ip_ioc():
         if not success:
             return jsonify({"success": False, "message": "Invalid IP format"}), 400
         
-        # Force reload after adding IOC
-        ioc_manager.reload_data()
-        
         return jsonify({"success": True, "message": f"Added IP IOC: {data['value']}"})
     except Exception as e:
         logger.error(f"Error adding IP IOC: {str(e)}")
@@ -86,9 +83,6 @@ def add_file_hash_ioc():
         if not success:
             return jsonify({"success": False, "message": f"Invalid {data['hash_type']} hash format"}), 400
         
-        # Force reload after adding IOC
-        ioc_manager.reload_data()
-        
         return jsonify({"success": True, "message": f"Added file hash IOC: {data['value']}"})
     except Exception as e:
         logger.error(f"Error adding file hash IOC: {str(e)}")
@@ -109,9 +103,6 @@ def add_url_ioc():
             severity=data.get('severity', 'medium')
         )
         
-        # Force reload after adding IOC
-        ioc_manager.reload_data()
-        
         return jsonify({"success": True, "message": f"Added URL IOC: {data['value']}"})
     except Exception as e:
         logger.error(f"Error adding URL IOC: {str(e)}")
@@ -138,9 +129,6 @@ def remove_ioc_post():
         if not success:
             return jsonify({"success": False, "message": f"IOC not found: {ioc_type}:{value}"}), 404
         
-        # Force reload after removing IOC
-        ioc_manager.reload_data()
-        
         return jsonify({"success": True, "message": f"Removed {ioc_type} IOC: {value}"})
     except Exception as e:
         logger.error(f"Error removing IOC: {str(e)}")
@@ -150,8 +138,8 @@ def remove_ioc_post():
 def send_ioc_updates():
     """Send IOC updates to all connected agents."""
     try:
-        # Force reload IOC data from disk first
-        ioc_manager.reload_data()
+        # Pick up IOC changes made on disk by anyone else first
+        ioc_manager.reload_if_changed()
         
         # Increment version number and save IOCs with new version
         ioc_manager._save_iocs(increment_version=True)
@@ -66,6 +66,10 @@ class Config:
     
     # gRPC server configuration
     GRPC_PORT = int(os.environ.get('GRPC_PORT', '50051'))
+    # Each connected agent's CommandStream holds one worker for its lifetime
+    GRPC_MAX_WORKERS = int(os.environ.get('GRPC_MAX_WORKERS', '200'))
+    # ListAgents responses grow with the fleet; gRPC's default cap is 4 MB
+    GRPC_MAX_MESSAGE_SIZE = int(os.environ.get('GRPC_MAX_MESSAGE_SIZE', str(64 * 1024 * 1024)))
     
     # Agent configuration
     AGENT_HEARTBEAT_INTERVAL = int(os.environ.get('AGENT_HEARTBEAT_INTERVAL', '60'))
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: agent.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0b\x61gent.proto\x12\x03\x65\x64r\"\xeb\x02\n\x0e\x43ommandMessage\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12&\n\x0cmessage_type\x18\x03 \x01(\x0e\x32\x10.edr.MessageType\x12 \n\x05hello\x18\x04 \x01(\x0b\x32\x0f.edr.AgentHelloH\x00\x12$\n\x06status\x18\x05 \x01(\x0b\x32\x12.edr.StatusRequestH\x00\x12\x1f\n\x07\x63ommand\x18\x06 \x01(\x0b\x32\x0c.edr.CommandH\x00\x12$\n\x06result\x18\x07 \x01(\x0b\x32\x12.edr.CommandResultH\x00\x12$\n\x08ioc_data\x18\x08 \x01(\x0b\x32\x10.edr.IOCResponseH\x00\x12$\n\x07running\x18\t \x01(\x0b\x32\x11.edr.AgentRunningH\x00\x12&\n\x08shutdown\x18\n \x01(\x0b\x32\x12.edr.AgentShutdownH\x00\x42\t\n\x07payload\"1\n\nAgentHello\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\"_\n\x0c\x41gentRunning\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12*\n\x0esystem_metrics\x18\x03 \x01(\x0b\x32\x12.edr.SystemMetrics\"D\n\rAgentShutdown\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12\x0e\n\x06reason\x18\x03 \x01(\t\"\xb6\x01\n\x0fRegisterRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x10\n\x08hostname\x18\x02 \x01(\t\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x13\n\x0bmac_address\x18\x04 \x01(\t\x12\x10\n\x08username\x18\x05 \x01(\t\x12\x12\n\nos_version\x18\x06 \x01(\t\x12\x15\n\ragent_version\x18\x07 \x01(\t\x12\x19\n\x11registration_time\x18\x08 \x01(\x03\"e\n\x10RegisterResponse\x12\x16\n\x0eserver_message\x18\x01 \x01(\t\x12\x0f\n\x07success\x18\x02 \x01(\x08\x12\x13\n\x0b\x61ssigned_id\x18\x03 \x01(\t\x12\x13\n\x0bserver_time\x18\x04 \x01(\x03\"p\n\rStatusRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x11\n\ttimestamp\x18\x02 \x01(\x03\x12\x0e\n\x06status\x18\x03 \x01(\t\x12*\n\x0esystem_metrics\x18\x04 \x01(\x0b\x32\x12.edr.SystemMetrics\"H\n\rSystemMetrics\x12\x11\n\tcpu_usage\x18\x01 \x01(\x01\x12\x14\n\x0cmemory_usage\x18\x02 \x01(\x01\x12\x0e\n\x06uptime\x18\x03 \x01(\x03\"S\n\x0eStatusResponse\x12\x16\n\x0eserver_message\x18\x01 \x01(\t\x12\x14\n\x0c\x61\x63knowledged\x18\x02 \x01(\x08\x12\x13\n\x0bserver_time\x18\x03 \x01(\x03\"\xde\x01\n\x07\x43ommand\x12\x12\n\ncommand_id\x18\x01 \x01(\t\x12\x10\n\x08\x61gent_id\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x1e\n\x04type\x18\x04 \x01(\x0e\x32\x10.edr.CommandType\x12(\n\x06params\x18\x05 \x03(\x0b\x32\x18.edr.Command.ParamsEntry\x12\x10\n\x08priority\x18\x06 \x01(\x05\x12\x0f\n\x07timeout\x18\x07 \x01(\x05\x1a-\n\x0bParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"\x84\x01\n\rCommandResult\x12\x12\n\ncommand_id\x18\x01 \x01(\t\x12\x10\n\x08\x61gent_id\x18\x02 \x01(\t\x12\x0f\n\x07success\x18\x03 \x01(\x08\x12\x0f\n\x07message\x18\x04 \x01(\t\x12\x16\n\x0e\x65xecution_time\x18\x05 \x01(\x03\x12\x13\n\x0b\x64uration_ms\x18\x06 \x01(\x03\"C\n\nCommandAck\x12\x12\n\ncommand_id\x18\x01 \x01(\t\x12\x10\n\x08received\x18\x02 \x01(\x08\x12\x0f\n\x07message\x18\x03 \x01(\t\"3\n\x12SendCommandRequest\x12\x1d\n\x07\x63ommand\x18\x01 \x01(\x0b\x32\x0c.edr.Command\"7\n\x13SendCommandResponse\x12\x0f\n\x07success\x18\x01 \x01(\x08\x12\x0f\n\x07message\x18\x02 \x01(\t\"\x13\n\x11ListAgentsRequest\"\xb0\x01\n\tAgentInfo\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x10\n\x08hostname\x18\x02 \x01(\t\x12\x12\n\nip_address\x18\x03 \x01(\t\x12\x13\n\x0bmac_address\x18\x04 \x01(\t\x12\x10\n\x08username\x18\x05 \x01(\t\x12\x12\n\nos_version\x18\x06 \x01(\t\x12\x15\n\ragent_version\x18\x07 \x01(\t\x12\x19\n\x11registration_time\x18\x08 \x01(\x03\"4\n\x12ListAgentsResponse\x12\x1e\n\x06\x61gents\x18\x01 \x03(\x0b\x32\x0e.edr.AgentInfo\"\x9e\x01\n\x07IOCData\x12\r\n\x05value\x18\x01 \x01(\t\x12\x13\n\x0b\x64\x65scription\x18\x02 \x01(\t\x12\x10\n\x08severity\x18\x03 \x01(\t\x12,\n\x08metadata\x18\x04 \x03(\x0b\x32\x1a.edr.IOCData.MetadataEntry\x1a/\n\rMetadataEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01\"K\n\nIOCRequest\x12\x10\n\x08\x61gent_id\x18\x01 \x01(\t\x12\x17\n\x0f\x63urrent_version\x18\x02 \x01(\x03\x12\x12\n\nchunk_size\x18\x03 \x01(\x05\"\xa3\x03\n\x0bIOCResponse\x12\x18\n\x10update_available\x18\x01 \x01(\x08\x12\x0f\n\x07version\x18\x02 \x01(\x03\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x37\n\x0cip_addresses\x18\x04 \x03(\x0b\x32!.edr.IOCResponse.IpAddressesEntry\x12\x35\n\x0b\x66ile_hashes\x18\x05 \x03(\x0b\x32 .edr.IOCResponse.FileHashesEntry\x12(\n\x04urls\x18\x06 \x03(\x0b\x32\x1a.edr.IOCResponse.UrlsEntry\x1a@\n\x10IpAddressesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1b\n\x05value\x18\x02 \x01(\x0b\x32\x0c.edr.IOCData:\x02\x38\x01\x1a?\n\x0f\x46ileHashesEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1b\n\x05value\x18\x02 \x01(\x0b\x32\x0c.edr.IOCData:\x02\x38\x01\x1a\x39\n\tUrlsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1b\n\x05value\x18\x02 \x01(\x0b\x32\x0c.edr.IOCData:\x02\x38\x01\"\x89\x02\n\x0eIOCMatchReport\x12\x11\n\treport_id\x18\x01 \x01(\t\x12\x10\n\x08\x61gent_id\x18\x02 \x01(\t\x12\x11\n\ttimestamp\x18\x03 \x01(\x03\x12\x1a\n\x04type\x18\x04 \x01(\x0e\x32\x0c.edr.IOCType\x12\x11\n\tioc_value\x18\x05 \x01(\t\x12\x15\n\rmatched_value\x18\x06 \x01(\t\x12\x0f\n\x07\x63ontext\x18\x07 \x01(\t\x12\x10\n\x08severity\x18\x08 \x01(\t\x12&\n\x0c\x61\x63tion_taken\x18\t \x01(\x0e\x32\x10.edr.CommandType\x12\x16\n\x0e\x61\x63tion_success\x18\n \x01(\x08\x12\x16\n\x0e\x61\x63tion_message\x18\x0b \x01(\t\"\x83\x02\n\x0bIOCMatchAck\x12\x11\n\treport_id\x18\x01 \x01(\t\x12\x10\n\x08received\x18\x02 \x01(\x08\x12\x0f\n\x07message\x18\x03 \x01(\t\x12!\n\x19perform_additional_action\x18\x04 \x01(\x08\x12+\n\x11\x61\x64\x64itional_action\x18\x05 \x01(\x0e\x32\x10.edr.CommandType\x12\x39\n\raction_params\x18\x06 \x03(\x0b\x32\".edr.IOCMatchAck.ActionParamsEntry\x1a\x33\n\x11\x41\x63tionParamsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\r\n\x05value\x18\x02 \x01(\t:\x02\x38\x01*\xac\x01\n\x0b\x43ommandType\x12\x0b\n\x07UNKNOWN\x10\x00\x12\x0f\n\x0b\x44\x45LETE_FILE\x10\x01\x12\x10\n\x0cKILL_PROCESS\x10\x02\x12\x15\n\x11KILL_PROCESS_TREE\x10\x03\x12\x0c\n\x08\x42LOCK_IP\x10\x04\x12\r\n\tBLOCK_URL\x10\x05\x12\x13\n\x0fNETWORK_ISOLATE\x10\x06\x12\x13\n\x0fNETWORK_RESTORE\x10\x07\x12\x0f\n\x0bUPDATE_IOCS\x10\x08*A\n\x07IOCType\x12\x0f\n\x0bIOC_UNKNOWN\x10\x00\x12\n\n\x06IOC_IP\x10\x01\x12\x0c\n\x08IOC_HASH\x10\x02\x12\x0b\n\x07IOC_URL\x10\x03*\x8d\x01\n\x0bMessageType\x12\x0f\n\x0b\x41GENT_HELLO\x10\x00\x12\x10\n\x0c\x41GENT_STATUS\x10\x01\x12\x12\n\x0eSERVER_COMMAND\x10\x02\x12\x12\n\x0e\x43OMMAND_RESULT\x10\x03\x12\x0c\n\x08IOC_DATA\x10\x04\x12\x11\n\rAGENT_RUNNING\x10\x05\x12\x12\n\x0e\x41GENT_SHUTDOWN\x10\x06\x32\xeb\x03\n\nEDRService\x12<\n\rRegisterAgent\x12\x14.edr.RegisterRequest\x1a\x15.edr.RegisterResponse\x12\x37\n\x0cUpdateStatus\x12\x12.edr.StatusRequest\x1a\x13.edr.StatusResponse\x12=\n\rCommandStream\x12\x13.edr.CommandMessage\x1a\x13.edr.CommandMessage(\x01\x30\x01\x12:\n\x13ReportCommandResult\x12\x12.edr.CommandResult\x1a\x0f.edr.CommandAck\x12@\n\x0bSendCommand\x12\x17.edr.SendCommandRequest\x1a\x18.edr.SendCommandResponse\x12=\n\nListAgents\x12\x16.edr.ListAgentsRequest\x1a\x17.edr.ListAgentsResponse\x12\x37\n\x0eReportIOCMatch\x12\x13.edr.IOCMatchReport\x1a\x10.edr.IOCMatchAck\x12\x31\n\nStreamIOCs\x12\x0f.edr.IOCRequest\x1a\x10.edr.IOCResponse0\x01\x42\x0fH\x01Z\x0b\x61gent/protob\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'agent_pb2', _globals)
+if _descriptor._USE_C_DESCRIPTORS == False:
+  DESCRIPTOR._options = None
+  DESCRIPTOR._serialized_options = b'H\001Z\013agent/proto'
+  _COMMAND_PARAMSENTRY._options = None
+  _COMMAND_PARAMSENTRY._serialized_options = b'8\001'
+  _IOCDATA_METADATAENTRY._options = None
+  _IOCDATA_METADATAENTRY._serialized_options = b'8\001'
+  _IOCRESPONSE_IPADDRESSESENTRY._options = None
+  _IOCRESPONSE_IPADDRESSESENTRY._serialized_options = b'8\001'
+  _IOCRESPONSE_FILEHASHESENTRY._options = None
+  _IOCRESPONSE_FILEHASHESENTRY._serialized_options = b'8\001'
+  _IOCRESPONSE_URLSENTRY._options = None
+  _IOCRESPONSE_URLSENTRY._serialized_options = b'8\001'
+  _IOCMATCHACK_ACTIONPARAMSENTRY._options = None
+  _IOCMATCHACK_ACTIONPARAMSENTRY._serialized_options = b'8\001'
+  _globals['_COMMANDTYPE']._serialized_start=3149
+  _globals['_COMMANDTYPE']._serialized_end=3321
+  _globals['_IOCTYPE']._serialized_start=3323
+  _globals['_IOCTYPE']._serialized_end=3388
+  _globals['_MESSAGETYPE']._serialized_start=3391
+  _globals['_MESSAGETYPE']._serialized_end=3532
+  _globals['_COMMANDMESSAGE']._serialized_start=21
+  _globals['_COMMANDMESSAGE']._serialized_end=384
+  _globals['_AGENTHELLO']._serialized_start=386
+  _globals['_AGENTHELLO']._serialized_end=435
+  _globals['_AGENTRUNNING']._serialized_start=437
+  _globals['_AGENTRUNNING']._serialized_end=532
+  _globals['_AGENTSHUTDOWN']._serialized_start=534
+  _globals['_AGENTSHUTDOWN']._serialized_end=602
+  _globals['_REGISTERREQUEST']._serialized_start=605
+  _globals['_REGISTERREQUEST']._serialized_end=787
+  _globals['_REGISTERRESPONSE']._serialized_start=789
+  _globals['_REGISTERRESPONSE']._serialized_end=890
+  _globals['_STATUSREQUEST']._serialized_start=892
+  _globals['_STATUSREQUEST']._serialized_end=1004
+  _globals['_SYSTEMMETRICS']._serialized_start=1006
+  _globals['_SYSTEMMETRICS']._serialized_end=1078
+  _globals['_STATUSRESPONSE']._serialized_start=1080
+  _globals['_STATUSRESPONSE']._serialized_end=1163
+  _globals['_COMMAND']._serialized_start=1166
+  _globals['_COMMAND']._serialized_end=1388
+  _globals['_COMMAND_PARAMSENTRY']._serialized_start=1343
+  _globals['_COMMAND_PARAMSENTRY']._serialized_end=1388
+  _globals['_COMMANDRESULT']._serialized_start=1391
+  _globals['_COMMANDRESULT']._serialized_end=1523
+  _globals['_COMMANDACK']._serialized_start=1525
+  _globals['_COMMANDACK']._serialized_end=1592
+  _globals['_SENDCOMMANDREQUEST']._serialized_start=1594
+  _globals['_SENDCOMMANDREQUEST']._serialized_end=1645
+  _globals['_SENDCOMMANDRESPONSE']._serialized_start=1647
+  _globals['_SENDCOMMANDRESPONSE']._serialized_end=1702
+  _globals['_LISTAGENTSREQUEST']._serialized_start=1704
+  _globals['_LISTAGENTSREQUEST']._serialized_end=1723
+  _globals['_AGENTINFO']._serialized_start=1726
+  _globals['_AGENTINFO']._serialized_end=1902
+  _globals['_LISTAGENTSRESPONSE']._serialized_start=1904
+  _globals['_LISTAGENTSRESPONSE']._serialized_end=1956
+  _globals['_IOCDATA']._serialized_start=1959
+  _globals['_IOCDATA']._serialized_end=2117
+  _globals['_IOCDATA_METADATAENTRY']._serialized_start=2070
+  _globals['_IOCDATA_METADATAENTRY']._serialized_end=2117
+  _globals['_IOCREQUEST']._serialized_start=2119
+  _globals['_IOCREQUEST']._serialized_end=2194
+  _globals['_IOCRESPONSE']._serialized_start=2197
+  _globals['_IOCRESPONSE']._serialized_end=2616
+  _globals['_IOCRESPONSE_IPADDRESSESENTRY']._serialized_start=2428
+  _globals['_IOCRESPONSE_IPADDRESSESENTRY']._serialized_end=2492
+  _globals['_IOCRESPONSE_FILEHASHESENTRY']._serialized_start=2494
+  _globals['_IOCRESPONSE_FILEHASHESENTRY']._serialized_end=2557
+  _globals['_IOCRESPONSE_URLSENTRY']._serialized_start=2559
+  _globals['_IOCRESPONSE_URLSENTRY']._serialized_end=2616
+  _globals['_IOCMATCHREPORT']._serialized_start=2619
+  _globals['_IOCMATCHREPORT']._serialized_end=2884
+  _globals['_IOCMATCHACK']._serialized_start=2887
+  _globals['_IOCMATCHACK']._serialized_end=3146
+  _globals['_IOCMATCHACK_ACTIONPARAMSENTRY']._serialized_start=3095
+  _globals['_IOCMATCHACK_ACTIONPARAMSENTRY']._serialized_end=3146
+  _globals['_EDRSERVICE']._serialized_start=3535
+  _globals['_EDRSERVICE']._serialized_end=4026
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,308 @@
+# Generated by the gRPC Python protocol compiler plugin. DO NOT EDIT!
+"""Client and server classes corresponding to protobuf-defined services."""
+import grpc
+
+from . import agent_pb2 as agent__pb2
+
+
+class EDRServiceStub(object):
+    """EDR agent service
+    """
+
+    def __init__(self, channel):
+        """Constructor.
+
+        Args:
+            channel: A grpc.Channel.
+        """
+        self.RegisterAgent = channel.unary_unary(
+                '/edr.EDRService/RegisterAgent',
+                request_serializer=agent__pb2.RegisterRequest.SerializeToString,
+                response_deserializer=agent__pb2.RegisterResponse.FromString,
+                )
+        self.UpdateStatus = channel.unary_unary(
+                '/edr.EDRService/UpdateStatus',
+                request_serializer=agent__pb2.StatusRequest.SerializeToString,
+                response_deserializer=agent__pb2.StatusResponse.FromString,
+                )
+        self.CommandStream = channel.stream_stream(
+                '/edr.EDRService/CommandStream',
+                request_serializer=agent__pb2.CommandMessage.SerializeToString,
+                response_deserializer=agent__pb2.CommandMessage.FromString,
+                )
+        self.ReportCommandResult = channel.unary_unary(
+                '/edr.EDRService/ReportCommandResult',
+                request_serializer=agent__pb2.CommandResult.SerializeToString,
+                response_deserializer=agent__pb2.CommandAck.FromString,
+                )
+        self.SendCommand = channel.unary_unary(
+                '/edr.EDRService/SendCommand',
+                request_serializer=agent__pb2.SendCommandRequest.SerializeToString,
+                response_deserializer=agent__pb2.SendCommandResponse.FromString,
+                )
+        self.ListAgents = channel.unary_unary(
+                '/edr.EDRService/ListAgents',
+                request_serializer=agent__pb2.ListAgentsRequest.SerializeToString,
+                response_deserializer=agent__pb2.ListAgentsResponse.FromString,
+                )
+        self.ReportIOCMatch = channel.unary_unary(
+                '/edr.EDRService/ReportIOCMatch',
+                request_serializer=agent__pb2.IOCMatchReport.SerializeToString,
+                response_deserializer=agent__pb2.IOCMatchAck.FromString,
+                )
+        self.StreamIOCs = channel.unary_stream(
+                '/edr.EDRService/StreamIOCs',
+                request_serializer=agent__pb2.IOCRequest.SerializeToString,
+                response_deserializer=agent__pb2.IOCResponse.FromString,
+                )
+
+
+class EDRServiceServicer(object):
+    """EDR agent service
+    """
+
+    def RegisterAgent(self, request, context):
+        """Register agent with the server
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def UpdateStatus(self, request, context):
+        """Update agent status
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def CommandStream(self, request_iterator, context):
+        """Bidirectional streaming for agent-server communication
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReportCommandResult(self, request, context):
+        """Report command execution result (keeping for backward compatibility)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def SendCommand(self, request, context):
+        """Send command to agent (server-initiated)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ListAgents(self, request, context):
+        """List all agents
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def ReportIOCMatch(self, request, context):
+        """Report IOC match from agent
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+    def StreamIOCs(self, request, context):
+        """Stream the IOC database in chunks (agent merges chunks until the stream ends)
+        """
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
+
+def add_EDRServiceServicer_to_server(servicer, server):
+    rpc_method_handlers = {
+            'RegisterAgent': grpc.unary_unary_rpc_method_handler(
+                    servicer.RegisterAgent,
+                    request_deserializer=agent__pb2.RegisterRequest.FromString,
+                    response_serializer=agent__pb2.RegisterResponse.SerializeToString,
+            ),
+            'UpdateStatus': grpc.unary_unary_rpc_method_handler(
+                    servicer.UpdateStatus,
+                    request_deserializer=agent__pb2.StatusRequest.FromString,
+                    response_serializer=agent__pb2.StatusResponse.SerializeToString,
+            ),
+            'CommandStream': grpc.stream_stream_rpc_method_handler(
+                    servicer.CommandStream,
+                    request_deserializer=agent__pb2.CommandMessage.FromString,
+                    response_serializer=agent__pb2.CommandMessage.SerializeToString,
+            ),
+            'ReportCommandResult': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReportCommandResult,
+                    request_deserializer=agent__pb2.CommandResult.FromString,
+                    response_serializer=agent__pb2.CommandAck.SerializeToString,
+            ),
+            'SendCommand': grpc.unary_unary_rpc_method_handler(
+                    servicer.SendCommand,
+                    request_deserializer=agent__pb2.SendCommandRequest.FromString,
+                    response_serializer=agent__pb2.SendCommandResponse.SerializeToString,
+            ),
+            'ListAgents': grpc.unary_unary_rpc_method_handler(
+                    servicer.ListAgents,
+                    request_deserializer=agent__pb2.ListAgentsRequest.FromString,
+                    response_serializer=agent__pb2.ListAgentsResponse.SerializeToString,
+            ),
+            'ReportIOCMatch': grpc.unary_unary_rpc_method_handler(
+                    servicer.ReportIOCMatch,
+                    request_deserializer=agent__pb2.IOCMatchReport.FromString,
+                    response_serializer=agent__pb2.IOCMatchAck.SerializeToString,
+            ),
+            'StreamIOCs': grpc.unary_stream_rpc_method_handler(
+                    servicer.StreamIOCs,
+                    request_deserializer=agent__pb2.IOCRequest.FromString,
+                    response_serializer=agent__pb2.IOCResponse.SerializeToString,
+            ),
+    }
+    generic_handler = grpc.method_handlers_generic_handler(
+            'edr.EDRService', rpc_method_handlers)
+    server.add_generic_rpc_handlers((generic_handler,))
+
+
+ # This class is part of an EXPERIMENTAL API.
+class EDRService(object):
+    """EDR agent service
+    """
+
+    @staticmethod
+    def RegisterAgent(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/RegisterAgent',
+            agent__pb2.RegisterRequest.SerializeToString,
+            agent__pb2.RegisterResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def UpdateStatus(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/UpdateStatus',
+            agent__pb2.StatusRequest.SerializeToString,
+            agent__pb2.StatusResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def CommandStream(request_iterator,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.stream_stream(request_iterator, target, '/edr.EDRService/CommandStream',
+            agent__pb2.CommandMessage.SerializeToString,
+            agent__pb2.CommandMessage.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ReportCommandResult(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/ReportCommandResult',
+            agent__pb2.CommandResult.SerializeToString,
+            agent__pb2.CommandAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def SendCommand(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/SendCommand',
+            agent__pb2.SendCommandRequest.SerializeToString,
+            agent__pb2.SendCommandResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ListAgents(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/ListAgents',
+            agent__pb2.ListAgentsRequest.SerializeToString,
+            agent__pb2.ListAgentsResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def ReportIOCMatch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(request, target, '/edr.EDRService/ReportIOCMatch',
+            agent__pb2.IOCMatchReport.SerializeToString,
+            agent__pb2.IOCMatchAck.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def StreamIOCs(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/edr.EDRService/StreamIOCs',
+            agent__pb2.IOCRequest.SerializeToString,
+            agent__pb2.IOCResponse.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -6,17 +6,20 @@ import time
 import json
 import os
 import uuid
+import queue
 import threading
 from concurrent import futures
-from collections import defaultdict
+from urllib.parse import unquote
 
 import grpc
+from google.protobuf.internal import api_implementation
 from app.grpc import agent_pb2
 from app.grpc import agent_pb2_grpc
 from app.config.config import config
 from app.logging_setup import get_logger, PerformanceLogger
 from app.iocs import IOCManager
-from app.storage import FileStorage
+from app.storage import AgentRecord, FileStorage, IOCMatchRecord, replay_log
+from app.utils.json_utils import json_loads
 
 # Set up logging
 logger = get_logger('app.grpc')
@@ -24,6 +27,17 @@ conn_logger = get_logger('app.grpc.connections')
 debug_logger = get_logger('app.grpc.debug')
 ioc_logger = get_logger('app.grpc.ioc')
 
+# Maximum number of undelivered commands queued per agent
+PENDING_COMMANDS_MAX = 1024
+
+# Enum value -> name lookups, avoiding protobuf descriptor calls per request
+IOC_TYPE_NAMES = {v.number: v.name for v in agent_pb2.IOCType.DESCRIPTOR.values}
+COMMAND_TYPE_NAMES = {v.number: v.name for v in agent_pb2.CommandType.DESCRIPTOR.values}
+
+# Default and maximum number of IOCs per StreamIOCs response
+IOC_STREAM_CHUNK_SIZE = 500
+IOC_STREAM_CHUNK_MAX = 5000
+
 # Define a dictionary for easy access to loggers
 loggers = {
     'main': logger,
@@ -32,6 +46,24 @@ loggers = {
     'ioc': ioc_logger
 }
 
+def _parse_peer(peer):
+    """Extract the client IP address from a gRPC peer string.
+    
+    Args:
+        peer (str): Peer string such as 'ipv4:1.2.3.4:5678' or 'ipv6:[::1]:5678'
+        
+    Returns:
+        str: Client IP address, or 'unknown' if the peer is not an IP endpoint
+    """
+    scheme, _, address = peer.partition(':')
+    if scheme not in ('ipv4', 'ipv6') or not address:
+        return 'unknown'
+    
+    host = address.rsplit(':', 1)[0]
+    if '%' in host:
+        host = unquote(host)
+    return host.strip('[]')
+
 class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
     """Implementation of EDRService service."""
     
@@ -50,16 +82,66 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
         self.results_lock = threading.Lock()
         self.load_command_results()
         
-        # Pending commands for offline agents
-        self.pending_commands = defaultdict(list)
+        # Results are appended to a log by a flusher thread, coalescing bursts into
+        # one write; the log is compacted into the snapshot every so many results
+        self.results_flush_interval = 0.5
+        self.results_compact_records = 1000
+        self._results_pending = []
+        self._results_dirty = threading.Event()
+        self._results_flush_lock = threading.Lock()
+        self._results_flush_thread = threading.Thread(target=self._results_flush_loop, daemon=True)
+        self._results_flush_thread.start()
+        
+        # Pending commands for offline agents (bounded queue per agent)
+        self.pending_commands = {}
+        
+        # Agents with an undelivered UPDATE_IOCS command, guarded by its own lock so
+        # IOC checks never contend with stream registration
+        self.queued_ioc_updates = set()
+        self.ioc_update_lock = threading.Lock()
+        
+        # IDs of IOC update commands whose results should not be stored; only
+        # touched with single set operations, which are atomic. IDs of commands
+        # sent on a stream are dropped when that stream closes
+        self.ioc_command_ids = set()
+        
+        # Serialized IOCResponse payload, keyed by IOC manager revision
+        self._ioc_response_cache = None
+        self._ioc_cache_lock = threading.Lock()
+        
+        # Serialized ListAgents response, keyed by storage revision
+        self._list_agents_cache = None
+        
+        # Template for queued IOC update commands; only the IDs and timestamp differ per agent
+        self._ioc_cmd_template = agent_pb2.Command(
+            type=agent_pb2.CommandType.UPDATE_IOCS,
+            priority=1,
+            timeout=120
+        )
+        
+        # Template for the IOC match acknowledgment; only the report ID differs per report
+        self._ioc_match_ack_template = agent_pb2.IOCMatchAck(
+            received=True,
+            message="IOC match report received"
+        )
+        
+        # Templates for the per-RPC acknowledgments of status updates and command results
+        self._status_ack_template = agent_pb2.StatusResponse(
+            server_message="Status update acknowledged",
+            acknowledged=True
+        )
+        self._result_ack_template = agent_pb2.CommandAck(
+            received=True,
+            message="Result received"
+        )
     
     def load_command_results(self):
         """Load command results from file."""
         results_file = os.path.join(self.storage.storage_dir, 'command_results.json')
         if os.path.exists(results_file):
             try:
-                with open(results_file, 'r') as f:
-                    self.command_results = json.load(f)
+                with open(results_file, 'rb') as f:
+                    self.command_results = json_loads(f.read())
                     logger.info(f"Loaded {len(self.command_results)} command results from storage")
             except json.JSONDecodeError:
                 logger.error(f"Failed to parse command results file, using empty results")
@@ -79,22 +161,72 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
         else:
             logger.info("No existing command results found")
             self.command_results = {}
+        
+        # Apply results logged since the last snapshot
+        try:
+            self._results_log_records = replay_log(self.storage.results_log_file, self.command_results)
+            if self._results_log_records:
+                logger.info(f"Replayed {self._results_log_records} command results from log")
+        except Exception as e:
+            logger.error(f"Error replaying command results log: {e}")
+            self._results_log_records = 0
     
-    def save_command_results(self):
-        """Save command results to file."""
-        results_file = os.path.join(self.storage.storage_dir, 'command_results.json')
-        with open(results_file, 'w') as f:
-            json.dump(self.command_results, f, indent=2)
+    def save_command_result(self, command_id, result_dict):
+        """Store a command result and schedule it to be saved by the flusher thread.
+        
+        Must be called with results_lock held.
+        """
+        self.command_results[command_id] = result_dict
+        self._results_pending.append((command_id, result_dict))
+        self._results_dirty.set()
+    
+    def flush_command_results(self):
+        """Save pending command results to file now."""
+        with self._results_flush_lock:
+            with self.results_lock:
+                batch = self._results_pending
+                self._results_pending = []
+                self._results_dirty.clear()
+                if not batch:
+                    return True
+                
+                compact = self._results_log_records + len(batch) >= self.results_compact_records
+                snapshot = dict(self.command_results) if compact else None
             
-        logger.info(f"Saved {len(self.command_results)} command results to storage")
+            if compact:
+                success = self.storage.save_command_results(snapshot)
+                if success:
+                    self._results_log_records = 0
+                    logger.info(f"Saved {len(snapshot)} command results to storage")
+            else:
+                success = self.storage.append_command_results(batch)
+                if success:
+                    self._results_log_records += len(batch)
+                    logger.info(f"Logged {len(batch)} command results to storage")
+            
+            if not success:
+                # The results are still in memory; write a full snapshot on the next flush
+                with self.results_lock:
+                    self._results_log_records = self.results_compact_records
+                    self._results_pending.extend(batch)
+                    self._results_dirty.set()
+            return success
+    
+    def _results_flush_loop(self):
+        """Flush command results shortly after they change."""
+        while True:
+            self._results_dirty.wait()
+            time.sleep(self.results_flush_interval)
+            self.flush_command_results()
     
     def RegisterAgent(self, request, context):
         """Handle agent registration."""
-        logger.info(f"New Agent Registration - ID: {request.agent_id}, Hostname: {request.hostname}")
-        debug_logger.info(f"Registration details - OS: {request.os_version}, Agent version: {request.agent_version}")
+        logger.info("New Agent Registration - ID: %s, Hostname: %s", request.agent_id, request.hostname)
+        debug_logger.info("Registration details - OS: %s, Agent version: %s", request.os_version, request.agent_version)
         
         agent_id = request.agent_id
         hostname = request.hostname
+        now = int(time.time())
         
         # Server-controlled ID assignment with collision protection
         if not agent_id:
@@ -103,41 +235,41 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
             for attempt in range(max_attempts):
                 agent_id = str(uuid.uuid4())
                 if agent_id not in self.storage.agents:
-                    logger.info(f"Generated new unique agent ID: {agent_id}")
+                    logger.info("Generated new unique agent ID: %s", agent_id)
                     break
                 else:
-                    logger.warning(f"UUID collision detected (attempt {attempt + 1}): {agent_id}")
+                    logger.warning("UUID collision detected (attempt %s): %s", attempt + 1, agent_id)
             else:
                 # Virtually impossible scenario - all attempts failed
                 raise Exception(f"Failed to generate unique agent ID after {max_attempts} attempts")
         elif agent_id in self.storage.agents:
             # Case 2: Agent ID exists → Re-registration, keep existing ID
-            logger.info(f"Agent {agent_id} registered from {hostname}")
+            logger.info("Agent %s registered from %s", agent_id, hostname)
         
         # Store agent information
-        agent_data = {
-            'agent_id': agent_id,
-            'hostname': hostname,
-            'ip_address': request.ip_address,
-            'mac_address': request.mac_address,
-            'username': request.username,
-            'os_version': request.os_version,
-            'agent_version': request.agent_version,
-            'registration_time': request.registration_time,
-            'last_seen': int(time.time()),
-            'status': 'REGISTERED',
-            'ioc_version': 0
-        }
+        agent_data = AgentRecord(
+            agent_id=agent_id,
+            hostname=hostname,
+            ip_address=request.ip_address,
+            mac_address=request.mac_address,
+            username=request.username,
+            os_version=request.os_version,
+            agent_version=request.agent_version,
+            registration_time=request.registration_time,
+            last_seen=now,
+            status='REGISTERED',
+            ioc_version=0
+        )
         
         self.storage.save_agent(agent_id, agent_data)
-        logger.info(f"Registration successful for {hostname} with ID {agent_id}")
+        logger.info("Registration successful for %s with ID %s", hostname, agent_id)
         
         # Return response with assigned ID
         return agent_pb2.RegisterResponse(
             server_message=f"Registration successful for {hostname}",
             success=True,
             assigned_id=agent_id,
-            server_time=int(time.time())
+            server_time=now
         )
     
     def UpdateStatus(self, request, context):
@@ -147,93 +279,155 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
         status = request.status
         
         # print(f"[DEBUG] UpdateStatus called: agent={agent_id}, status={status}")
-        logger.info(f"Status update from agent {agent_id}: {status}")
         
         # Check if agent exists
         agent = self.storage.get_agent(agent_id)
         if agent:
-            # Update agent status - ensure it's changed from REGISTERED to ONLINE
-            if agent.get('status') == 'REGISTERED' and status == 'ONLINE':
-                logger.info(f"Agent {agent_id} status changing from REGISTERED to ONLINE")
-            
-            agent.update({
-                'last_seen': timestamp,
-                'status': status
-            })
-            
-            # Update metrics if provided
-            if request.system_metrics:
-                agent.update({
-                    'cpu_usage': request.system_metrics.cpu_usage,
-                    'memory_usage': request.system_metrics.memory_usage,
-                    'uptime': request.system_metrics.uptime
-                })
-            
-            self.storage.save_agent(agent_id, agent)
-            logger.info(f"Updated agent {agent_id} status to {status}")
+            previous_status = agent.get('status')
+            metrics = request.system_metrics if request.HasField('system_metrics') else None
+            self._apply_agent_update(agent, agent_id, timestamp, status, metrics)
+            logger.info("Updated agent %s status %s -> %s", agent_id, previous_status, status)
         else:
-            logger.warning(f"Received status update for unknown agent {agent_id}")
+            logger.warning("Received status update for unknown agent %s", agent_id)
         
-        return agent_pb2.StatusResponse(
-            server_message="Status update acknowledged",
-            acknowledged=True,
-            server_time=int(time.time())
-        )
+        response = agent_pb2.StatusResponse()
+        response.CopyFrom(self._status_ack_template)
+        response.server_time = int(time.time())
+        return response
+    
+    def _apply_agent_update(self, agent, agent_id, timestamp, status=None, system_metrics=None, force=False):
+        """Apply a status or ping update to an agent and persist it once.
+        
+        Args:
+            agent (dict): Agent record to update in place
+            agent_id (str): Agent ID
+            timestamp (int): Time the agent reported the update
+            status (str, optional): New status, or None to leave the status unchanged
+            system_metrics (SystemMetrics, optional): Metrics reported by the agent, or None if not sent
+            force (bool): Snapshot immediately instead of relying on the write-ahead log
+        """
+        # Heartbeats that don't change the status stay in memory until the next snapshot
+        status_changed = status is not None and status != agent.get('status')
+        fields = {'last_seen': timestamp}
+        if status_changed:
+            fields['status'] = status
+        
+        # Update metrics if provided
+        if system_metrics is not None:
+            fields.update({
+                'cpu_usage': system_metrics.cpu_usage,
+                'memory_usage': system_metrics.memory_usage,
+                'uptime': system_metrics.uptime
+            })
+        
+        # Only the changed fields are logged, not the whole record
+        agent.update(fields)
+        if status_changed:
+            persisted = self.storage.update_agent(agent_id, fields)
+        else:
+            persisted = self.storage.touch_agent(agent_id, fields)
+        if not persisted:
+            self.storage.save_agent(agent_id, agent)
+        if force:
+            self.storage.force_save()
+    
+    def _get_pending_queue(self, agent_id):
+        """Get the pending command queue for an agent, creating it if needed."""
+        pending = self.pending_commands.get(agent_id)
+        if pending is None:
+            pending = self.pending_commands.setdefault(agent_id, queue.Queue(maxsize=PENDING_COMMANDS_MAX))
+        return pending
     
     def _check_ioc_update_needed(self, agent, agent_id):
         """Check if agent needs IOC update."""
-        # Reload IOC data to ensure we have the latest version
-        self.ioc_manager.reload_data()
-        
-        ioc_version_info = self.ioc_manager.get_version_info()
         current_agent_ioc_version = agent.get('ioc_version', 0)
-        server_version = ioc_version_info['version']
+        server_version = self.ioc_manager.get_version_info()['version']
         
         # Log IOC version check
-        ioc_logger.debug(f"Checking if agent {agent_id} needs IOC update: agent version {current_agent_ioc_version}, server version {server_version}")
+        ioc_logger.debug("Checking if agent %s needs IOC update: agent version %s, server version %s", agent_id, current_agent_ioc_version, server_version)
         
         if current_agent_ioc_version < server_version:
-            with self.stream_lock:
+            with self.ioc_update_lock:
                 # Avoid duplicating UPDATE_IOCS commands
-                if agent_id in self.pending_commands and any(
-                    cmd.type == agent_pb2.CommandType.UPDATE_IOCS 
-                    for cmd in self.pending_commands[agent_id]
-                ):
-                    ioc_logger.debug(f"Agent {agent_id} already has a pending IOC update command")
+                if agent_id in self.queued_ioc_updates:
+                    ioc_logger.debug("Agent %s already has a pending IOC update command", agent_id)
                     return
                 
-                # Create a new UPDATE_IOCS command
+                # Create a new UPDATE_IOCS command from the template
                 command_id = str(uuid.uuid4())
-                command = agent_pb2.Command(
-                    command_id=command_id,
-                    agent_id=agent_id,
-                    timestamp=int(time.time()),
-                    type=agent_pb2.CommandType.UPDATE_IOCS,
-                    params={},
-                    priority=1,
-                    timeout=120
-                )
+                command = agent_pb2.Command()
+                command.CopyFrom(self._ioc_cmd_template)
+                command.command_id = command_id
+                command.agent_id = agent_id
+                command.timestamp = int(time.time())
                 
-                if agent_id not in self.pending_commands:
-                    self.pending_commands[agent_id] = []
-                    
-                self.pending_commands[agent_id].append(command)
-                ioc_logger.info(f"Agent {agent_id} needs IOC update: {current_agent_ioc_version} < {server_version}, queued command {command_id}")
+                try:
+                    self._get_pending_queue(agent_id).put_nowait(command)
+                except queue.Full:
+                    ioc_logger.warning("Command queue for agent %s is full, skipping IOC update", agent_id)
+                    return
+                
+                self.queued_ioc_updates.add(agent_id)
+                self.ioc_command_ids.add(command_id)
+                ioc_logger.info("Agent %s needs IOC update: %s < %s, queued command %s", agent_id, current_agent_ioc_version, server_version, command_id)
         else:
-            ioc_logger.debug(f"Agent {agent_id} IOC version is current: {current_agent_ioc_version} >= {server_version}")
+            ioc_logger.debug("Agent %s IOC version is current: %s >= %s", agent_id, current_agent_ioc_version, server_version)
+    
+    def _build_ioc_message(self, agent_id):
+        """Build the IOC_DATA stream message carrying the full IOC database.
+        
+        Args:
+            agent_id (str): Agent the message is addressed to
+            
+        Returns:
+            tuple: (CommandMessage, IOC version being sent)
+        """
+        # Pick up IOC changes made by other IOCManager instances
+        self.ioc_manager.get_version_info()
+        
+        # IOCs can change without a version bump, so build the payload once per
+        # IOC manager revision rather than once per version
+        with self._ioc_cache_lock:
+            revision, server_version, ioc_protos = self.ioc_manager.get_ioc_snapshot()
+            cached = self._ioc_response_cache
+            if cached is None or cached[0] != revision:
+                # IOCData messages are prebuilt by the IOC manager, so this is a map copy
+                ioc_response = agent_pb2.IOCResponse(
+                    update_available=True,
+                    version=server_version,
+                    ip_addresses=ioc_protos['ip_addresses'],
+                    file_hashes=ioc_protos['file_hashes'],
+                    urls=ioc_protos['urls']
+                )
+                
+                cached = (revision, server_version, ioc_response.SerializeToString())
+                self._ioc_response_cache = cached
+                logger.info("Cached IOC payload for version %s (%s bytes)", server_version, len(cached[2]))
+            server_version = cached[1]
+        logger.info("Using IOC version: %s for sending to agent %s", server_version, agent_id)
+        
+        # Wrap the cached IOC data in a stream message; only the timestamp is per-send
+        ioc_msg = agent_pb2.CommandMessage(
+            agent_id=agent_id,
+            timestamp=int(time.time()),
+            message_type=agent_pb2.MessageType.IOC_DATA
+        )
+        ioc_msg.ioc_data.MergeFromString(cached[2])
+        ioc_msg.ioc_data.timestamp = ioc_msg.timestamp
+        
+        return ioc_msg, server_version
     
     def CommandStream(self, request_iterator, context):
         """Bidirectional stream for agent-server communication."""
         agent_id = None
         agent = None
+        # UPDATE_IOCS commands sent on this stream
+        sent_ioc_command_ids = []
         
         # Create tracking variables for this connection
-        last_command_time = int(time.time())
-        last_status_update = 0
-        check_counter = 0
-        
-        # Update interval in minutes, converted to seconds
-        status_update_interval = 30 * 60  # 30 minutes in seconds
+        # Monotonic so wall-clock adjustments can't stall or burst the IOC checks
+        last_ioc_check = time.monotonic()
+        ioc_check_interval = 3  # seconds
         
         conn_logger.info("New bidirectional command stream opened")
         
@@ -242,37 +436,37 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
             for message in request_iterator:
                 if message.message_type == agent_pb2.MessageType.AGENT_HELLO:
                     agent_id = message.agent_id
-                    conn_logger.info(f"Bidirectional command stream initialized for agent {agent_id}")
+                    now = int(time.time())
+                    conn_logger.info("Bidirectional command stream initialized for agent %s", agent_id)
                     
                     # Get or auto-register agent
                     agent = self.storage.get_agent(agent_id)
                     if not agent:
-                        agent = {
-                            'agent_id': agent_id,
-                            'hostname': 'unknown',
-                            'ip_address': context.peer().split(':')[-1] if ':' in context.peer() else 'unknown',
-                            'mac_address': 'unknown',
-                            'username': 'unknown',
-                            'os_version': 'unknown',
-                            'agent_version': 'unknown',
-                            'registration_time': int(time.time()),
-                            'last_seen': int(time.time()),
-                            'status': 'PENDING_REGISTRATION',
-                            'ioc_version': 0
-                        }
+                        agent = AgentRecord(
+                            agent_id=agent_id,
+                            hostname='unknown',
+                            ip_address=_parse_peer(context.peer()),
+                            mac_address='unknown',
+                            username='unknown',
+                            os_version='unknown',
+                            agent_version='unknown',
+                            registration_time=now,
+                            last_seen=now,
+                            status='PENDING_REGISTRATION',
+                            ioc_version=0
+                        )
                         self.storage.save_agent(agent_id, agent)
-                        last_status_update = int(time.time())
-                        logger.info(f"Auto-registering unknown agent: {agent_id}")
+                        logger.info("Auto-registering unknown agent: %s", agent_id)
+                    else:
+                        # Don't auto-set ONLINE - wait for explicit status update
+                        self._apply_agent_update(agent, agent_id, now)
                     
                     # Register stream
                     with self.stream_lock:
                         self.active_streams[agent_id] = context
-                        conn_logger.debug(f"Registered bidirectional command stream for agent {agent_id}")
+                        conn_logger.debug("Registered bidirectional command stream for agent %s", agent_id)
                     
-                    # Don't auto-set ONLINE - wait for explicit status update
-                    agent['last_seen'] = int(time.time())
-                    self.storage.save_agent(agent_id, agent)
-                    logger.info(f"Agent {agent_id} connected - waiting for explicit ONLINE status")
+                    logger.info("Agent %s connected - waiting for explicit ONLINE status", agent_id)
                     
                     # Initial IOC check
                     self._check_ioc_update_needed(agent, agent_id)
@@ -280,12 +474,12 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
                     # Send acknowledgment
                     ack_msg = agent_pb2.CommandMessage(
                         agent_id=agent_id,
-                        timestamp=int(time.time()),
+                        timestamp=now,
                         message_type=agent_pb2.MessageType.AGENT_HELLO  # Reuse HELLO type for ack
                     )
                     hello = agent_pb2.AgentHello(
                         agent_id=agent_id,
-                        timestamp=int(time.time())
+                        timestamp=now
                     )
                     ack_msg.hello.CopyFrom(hello)
                     yield ack_msg
@@ -301,137 +495,98 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
             receive_thread.start()
             
             # Main thread will handle sending commands to the agent
+            pending = self._get_pending_queue(agent_id)
+            
+            # Wake the send loop as soon as the RPC ends instead of at the next timeout
+            def wake_on_disconnect():
+                try:
+                    pending.put_nowait(None)
+                except queue.Full:
+                    pass
+            context.add_callback(wake_on_disconnect)
+            
             while context.is_active():
-                current_time = int(time.time())
-                check_counter += 1
-                
-                # No need for periodic status updates - ping monitor handles timeouts
-                
                 # Periodic IOC check
-                if check_counter % 60 == 0:
+                current_time = time.monotonic()
+                if current_time - last_ioc_check >= ioc_check_interval:
                     self._check_ioc_update_needed(agent, agent_id)
+                    last_ioc_check = current_time
                 
-                # Process pending commands
-                with self.stream_lock:
-                    pending = self.pending_commands.get(agent_id, [])
-                    if pending:
-                        # Sort by priority/timestamp
-                        pending.sort(key=lambda cmd: cmd.timestamp, reverse=True)
-                        debug_logger.info(f"Found {len(pending)} pending commands for agent {agent_id}")
+                # Block until a command is queued or the next IOC check is due,
+                # then send everything else waiting for this agent. Commands are
+                # taken off the queue one at a time, right before they are sent, so
+                # a disconnect mid-batch leaves the rest queued for the next stream
+                wait = max(last_ioc_check + ioc_check_interval - current_time, 0.1)
+                try:
+                    command = pending.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                
+                ioc_msg = None
+                now = int(time.time())
+                while True:
+                    # None is a disconnect wake-up (possibly left over from an earlier stream)
+                    if command is None:
+                        if not context.is_active():
+                            break
+                    else:
+                        cmd_type_name = COMMAND_TYPE_NAMES.get(command.type, str(command.type))
+                        logger.info("Sending command %s (Type: %s) to agent %s", command.command_id, cmd_type_name, agent_id)
                         
-                        sent_command_ids = []
-                        for command in pending:
-                            if command.timestamp > last_command_time:
-                                cmd_type_name = agent_pb2.CommandType.Name(command.type)
-                                logger.info(f"Sending command {command.command_id} (Type: {cmd_type_name}) to agent {agent_id}")
-                                
-                                # Create command message
-                                cmd_msg = agent_pb2.CommandMessage(
-                                    agent_id=agent_id,
-                                    timestamp=int(time.time()),
-                                    message_type=agent_pb2.MessageType.SERVER_COMMAND
-                                )
-                                cmd_msg.command.CopyFrom(command)
-                                
-                                yield cmd_msg
-                                last_command_time = max(last_command_time, command.timestamp)
-                                sent_command_ids.append(command.command_id)
-                                
-                                # If this is an IOC update command, immediately send the IOC data
-                                if command.type == agent_pb2.CommandType.UPDATE_IOCS:
-                                    # Get current IOC data
-                                    ioc_version_info = self.ioc_manager.get_version_info()
-                                    server_version = ioc_version_info['version']
-                                    
-                                    # Debug log to show what version we're actually sending
-                                    logger.info(f"IOC version info from manager: {ioc_version_info}")
-                                    
-                                    all_iocs = self.ioc_manager.get_all_iocs()
-                                    iocs = all_iocs['iocs']
-                                    
-                                    # Debug log for all_iocs version
-                                    logger.info(f"IOC version from get_all_iocs(): {all_iocs.get('version')}")
-                                    
-                                    # Make sure we're using the right version
-                                    server_version = max(server_version, all_iocs.get('version', 0))
-                                    logger.info(f"Using IOC version: {server_version} for sending to agent {agent_id}")
-                                    
-                                    # Create IOC response
-                                    ioc_response = agent_pb2.IOCResponse(
-                                        update_available=True,
-                                        version=server_version,
-                                        timestamp=int(time.time())
-                                    )
-                                    
-                                    # Add IP addresses
-                                    for ip, info in iocs.get('ip_addresses', {}).items():
-                                        ioc_data = agent_pb2.IOCData(
-                                            value=ip,
-                                            description=info.get('description', ''),
-                                            severity=info.get('severity', 'medium')
-                                        )
-                                        ioc_response.ip_addresses[ip].CopyFrom(ioc_data)
-                                    
-                                    # Add file hashes
-                                    for file_hash, info in iocs.get('file_hashes', {}).items():
-                                        metadata = {}
-                                        if 'hash_type' in info:
-                                            metadata['hash_type'] = info['hash_type']
-                                        
-                                        ioc_data = agent_pb2.IOCData(
-                                            value=file_hash,
-                                            description=info.get('description', ''),
-                                            severity=info.get('severity', 'medium'),
-                                            metadata=metadata
-                                        )
-                                        ioc_response.file_hashes[file_hash].CopyFrom(ioc_data)
-                                    
-                                    # Add URLs
-                                    for url, info in iocs.get('urls', {}).items():
-                                        ioc_data = agent_pb2.IOCData(
-                                            value=url,
-                                            description=info.get('description', ''),
-                                            severity=info.get('severity', 'medium')
-                                        )
-                                        ioc_response.urls[url].CopyFrom(ioc_data)
-                                    
-                                    # Send IOC data message
-                                    ioc_msg = agent_pb2.CommandMessage(
-                                        agent_id=agent_id,
-                                        timestamp=int(time.time()),
-                                        message_type=agent_pb2.MessageType.IOC_DATA
-                                    )
-                                    ioc_msg.ioc_data.CopyFrom(ioc_response)
-                                    
-                                    yield ioc_msg
-                                    logger.info(f"Sent IOC data directly through command stream to agent {agent_id}: v{server_version}, {len(ioc_response.ip_addresses)} IPs, {len(ioc_response.file_hashes)} hashes, {len(ioc_response.urls)} URLs")
-                                    
-                                    # Update agent's IOC version in database
-                                    agent['ioc_version'] = server_version
-                                    self.storage.save_agent(agent_id, agent)
-                                    logger.info(f"Updated agent {agent_id} IOC version to {server_version}")
+                        # Create command message
+                        cmd_msg = agent_pb2.CommandMessage(
+                            agent_id=agent_id,
+                            timestamp=now,
+                            message_type=agent_pb2.MessageType.SERVER_COMMAND
+                        )
+                        cmd_msg.command.CopyFrom(command)
                         
-                        # Remove sent commands
-                        if sent_command_ids:
-                            self.pending_commands[agent_id] = [
-                                cmd for cmd in pending if cmd.command_id not in sent_command_ids
-                            ]
-                
-                time.sleep(0.05)
+                        if command.type == agent_pb2.CommandType.UPDATE_IOCS:
+                            # From here its result can only come back on this stream
+                            sent_ioc_command_ids.append(command.command_id)
+                        yield cmd_msg
+                        
+                        # If this is an IOC update command, immediately send the IOC data
+                        if command.type == agent_pb2.CommandType.UPDATE_IOCS:
+                            # Build the IOC payload once per batch
+                            first_ioc_send = ioc_msg is None
+                            if first_ioc_send:
+                                ioc_msg, server_version = self._build_ioc_message(agent_id)
+                            yield ioc_msg
+                            ioc_data = ioc_msg.ioc_data
+                            logger.info("Sent IOC data directly through command stream to agent %s: v%s, %s IPs, %s hashes, %s URLs",
+                                        agent_id, server_version, len(ioc_data.ip_addresses), len(ioc_data.file_hashes), len(ioc_data.urls))
+                            
+                            # Only now is the queued update delivered
+                            with self.ioc_update_lock:
+                                self.queued_ioc_updates.discard(agent_id)
+                            
+                            if first_ioc_send:
+                                # Update agent's IOC version in database (one write per batch)
+                                agent['ioc_version'] = server_version
+                                self.storage.update_agent(agent_id, {'ioc_version': server_version})
+                                logger.info("Updated agent %s IOC version to %s", agent_id, server_version)
+                    
+                    try:
+                        command = pending.get_nowait()
+                    except queue.Empty:
+                        break
                 
         except Exception as e:
-            logger.warning(f"Bidirectional command stream for agent {agent_id} ended: {e}")
+            logger.warning("Bidirectional command stream for agent %s ended: %s", agent_id, e)
         finally:
+            # Results for the IOC updates sent on this stream can't arrive any more
+            for command_id in sent_ioc_command_ids:
+                self.ioc_command_ids.discard(command_id)
+            
             if agent_id and agent:
                 # Update agent status and cleanup
-                agent['last_seen'] = int(time.time())
-                agent['status'] = 'OFFLINE'
-                self.storage.save_agent(agent_id, agent)
+                self._apply_agent_update(agent, agent_id, int(time.time()), 'OFFLINE')
                 
                 with self.stream_lock:
-                    if agent_id in self.active_streams and self.active_streams[agent_id] == context:
+                    if self.active_streams.get(agent_id) is context:
                         del self.active_streams[agent_id]
-                        conn_logger.debug(f"Unregistered bidirectional command stream for agent {agent_id}")
+                        conn_logger.debug("Unregistered bidirectional command stream for agent %s", agent_id)
     
     def _process_agent_messages(self, request_iterator, agent_id, context):
         """Process incoming messages from the agent in a separate thread."""
@@ -445,218 +600,131 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
                     status = status_req.status
                     
                     # print(f"[DEBUG] Status extracted: {status}")
-                    logger.info(f"Explicit status update from agent {agent_id}: {status}")
                     
                     # Check if agent exists
                     agent = self.storage.get_agent(agent_id)
                     if agent:
-                        # Update agent status
-                        agent.update({
-                            'last_seen': status_req.timestamp,
-                            'status': status
-                        })
-                        
-                        # Update metrics if provided
-                        if status_req.system_metrics:
-                            agent.update({
-                                'cpu_usage': status_req.system_metrics.cpu_usage,
-                                'memory_usage': status_req.system_metrics.memory_usage,
-                                'uptime': status_req.system_metrics.uptime
-                            })
-                        
-                        self.storage.save_agent(agent_id, agent)
-                        # Force save for status updates to ensure immediate persistence
-                        self.storage.force_save()
-                        # print(f"[DEBUG] Successfully saved agent {agent_id} with status {status}")
-                        logger.info(f"Updated agent {agent_id} status to {status}")
+                        # Status changes go to the write-ahead log, which is synced within a fraction of a second
+                        metrics = status_req.system_metrics if status_req.HasField('system_metrics') else None
+                        self._apply_agent_update(agent, agent_id, status_req.timestamp, status, metrics)
+                        logger.info("Explicit status update from agent %s: %s", agent_id, status)
                     else:
-                        # print(f"[DEBUG] Unknown agent {agent_id} for status update")
-                        logger.warning(f"Received status update for unknown agent {agent_id}")
+                        logger.warning("Received status update for unknown agent %s", agent_id)
                 
                 elif message.message_type == agent_pb2.MessageType.AGENT_RUNNING:
                     # Handle ping signal - only update last_seen and metrics, NOT status
-                    running_signal = message.running
-                    if running_signal:
-                        logger.debug(f"Ping signal from agent {agent_id}")
+                    if message.HasField('running'):
+                        running_signal = message.running
+                        logger.debug("Ping signal from agent %s", agent_id)
                         
                         # Update agent last_seen and metrics (but not status)
+                        # Do NOT update status here - let ping monitor handle timeouts
                         agent = self.storage.get_agent(agent_id)
                         if agent:
-                            agent.update({
-                                'last_seen': running_signal.timestamp
-                                # Do NOT update status here - let ping monitor handle timeouts
-                            })
-                            
-                            # Update metrics if provided
-                            if running_signal.system_metrics:
-                                agent.update({
-                                    'cpu_usage': running_signal.system_metrics.cpu_usage,
-                                    'memory_usage': running_signal.system_metrics.memory_usage,
-                                    'uptime': running_signal.system_metrics.uptime
-                                })
-                            
-                            self.storage.save_agent(agent_id, agent)
-                            debug_logger.debug(f"Updated last_seen for agent {agent_id} from ping")
+                            metrics = running_signal.system_metrics if running_signal.HasField('system_metrics') else None
+                            self._apply_agent_update(agent, agent_id, running_signal.timestamp, system_metrics=metrics)
+                            debug_logger.debug("Updated last_seen for agent %s from ping", agent_id)
                         else:
-                            logger.warning(f"Received ping signal for unknown agent {agent_id}")
+                            logger.warning("Received ping signal for unknown agent %s", agent_id)
                     else:
-                        logger.warning(f"Received AGENT_RUNNING message with no running payload from agent {agent_id}")
+                        logger.warning("Received AGENT_RUNNING message with no running payload from agent %s", agent_id)
                 
                 elif message.message_type == agent_pb2.MessageType.AGENT_SHUTDOWN:
                     # Handle explicit shutdown signal
-                    shutdown_signal = message.shutdown
-                    if shutdown_signal:
-                        logger.info(f"Shutdown signal from agent {agent_id}: {shutdown_signal.reason}")
+                    if message.HasField('shutdown'):
+                        shutdown_signal = message.shutdown
+                        logger.info("Shutdown signal from agent %s: %s", agent_id, shutdown_signal.reason)
                         
                         # Set agent to OFFLINE immediately
                         agent = self.storage.get_agent(agent_id)
                         if agent:
-                            agent.update({
-                                'last_seen': shutdown_signal.timestamp,
-                                'status': 'OFFLINE'
-                            })
-                            self.storage.save_agent(agent_id, agent)
                             # Force save for shutdown status to ensure immediate persistence
-                            self.storage.force_save()
-                            logger.info(f"Set agent {agent_id} to OFFLINE due to shutdown signal")
+                            self._apply_agent_update(agent, agent_id, shutdown_signal.timestamp, 'OFFLINE', force=True)
+                            logger.info("Set agent %s to OFFLINE due to shutdown signal", agent_id)
                         else:
-                            logger.warning(f"Received shutdown signal for unknown agent {agent_id}")
+                            logger.warning("Received shutdown signal for unknown agent %s", agent_id)
                     else:
-                        logger.warning(f"Received AGENT_SHUTDOWN message with no shutdown payload from agent {agent_id}")
+                        logger.warning("Received AGENT_SHUTDOWN message with no shutdown payload from agent %s", agent_id)
                 
                 elif message.message_type == agent_pb2.MessageType.COMMAND_RESULT:
-                    # Handle command result
-                    result = message.result
-                    command_id = result.command_id
-                    
-                    # Log result
-                    log_fn = logger.info if result.success else logger.warning
-                    log_fn(f"Command result from {agent_id}: {command_id} - Success: {result.success}, Duration: {result.duration_ms}ms")
-                    
-                    # Don't store IOC update related commands in command_results
-                    is_ioc_related = False
-                    
-                    # Check by command message
-                    if "IOC update available" in result.message or "No IOC update available" in result.message:
-                        is_ioc_related = True
-                        logger.debug(f"Skipping IOC update result storage: {result.message}")
-                    
-                    # Check by command type in pending commands
-                    if not is_ioc_related:
-                        for cmds in self.pending_commands.values():
-                            for cmd in cmds:
-                                if cmd.command_id == command_id and cmd.type == agent_pb2.CommandType.UPDATE_IOCS:
-                                    is_ioc_related = True
-                                    logger.debug(f"Skipping IOC update command result storage by command type")
-                                    break
-                            if is_ioc_related:
-                                break
-                    
-                    # Update agent's IOC version if this was a successful IOC update
-                    if is_ioc_related and "IOC update available" in result.message and result.success:
-                        agent = self.storage.get_agent(agent_id)
-                        if agent:
-                            agent['ioc_version'] = self.ioc_manager.get_version_info()['version']
-                            self.storage.save_agent(agent_id, agent)
-                            logger.info(f"Updated agent {agent_id} IOC version to {agent['ioc_version']}")
-                    
-                    # Store result only if not IOC related
-                    if not is_ioc_related:
-                        with self.results_lock:
-                            result_dict = {
-                                'command_id': result.command_id,
-                                'agent_id': result.agent_id,
-                                'success': result.success,
-                                'message': result.message,
-                                'execution_time': result.execution_time,
-                                'duration_ms': result.duration_ms
-                            }
-                            
-                            self.command_results[command_id] = result_dict
-                            self.save_command_results()
-                    
-                    # Remove from pending if present
-                    with self.stream_lock:
-                        if agent_id in self.pending_commands:
-                            self.pending_commands[agent_id] = [
-                                cmd for cmd in self.pending_commands[agent_id] 
-                                if cmd.command_id != command_id
-                            ]
+                    self._handle_command_result(message.result, agent_id)
                 
         except Exception as e:
-            logger.error(f"Error processing agent messages: {e}")
+            logger.error("Error processing agent messages: %s", e)
     
-    def ReportCommandResult(self, request, context):
-        """Handle command result from agent (legacy method)."""
-        command_id = request.command_id
-        agent_id = request.agent_id
+    def _handle_command_result(self, result, agent_id, legacy=False):
+        """Record a command result reported by an agent.
+        
+        Results of IOC update commands only advance the agent's IOC version;
+        all other results are stored in command_results.
+        
+        Args:
+            result (CommandResult): Result reported by the agent
+            agent_id (str): Reporting agent
+            legacy (bool): Whether the result came through ReportCommandResult
+        """
+        command_id = result.command_id
         
         # Log result
-        log_fn = logger.info if request.success else logger.warning
-        log_fn(f"Command result from {agent_id}: {command_id} - Success: {request.success}, Duration: {request.duration_ms}ms (legacy method)")
+        log_fn = logger.info if result.success else logger.warning
+        log_fn("Command result from %s: %s - Success: %s, Duration: %sms%s",
+               agent_id, command_id, result.success, result.duration_ms, " (legacy method)" if legacy else "")
         
         # Don't store IOC update related commands in command_results
         is_ioc_related = False
         
         # Check by command message
-        if "IOC update available" in request.message or "No IOC update available" in request.message:
+        if "IOC update available" in result.message or "No IOC update available" in result.message:
             is_ioc_related = True
-            logger.debug(f"Skipping IOC update result storage: {request.message}")
-        
-        # Check by command type in pending commands
-        if not is_ioc_related:
-            for cmds in self.pending_commands.values():
-                for cmd in cmds:
-                    if cmd.command_id == command_id and cmd.type == agent_pb2.CommandType.UPDATE_IOCS:
-                        is_ioc_related = True
-                        logger.debug(f"Skipping IOC update command result storage by command type")
-                        break
-                if is_ioc_related:
-                    break
+            logger.debug("Skipping IOC update result storage: %s", result.message)
+        
+        # Check by command type of the commands we queued; discard, since a
+        # duplicate result may arrive after the ID is gone
+        if command_id in self.ioc_command_ids:
+            self.ioc_command_ids.discard(command_id)
+            if not is_ioc_related:
+                is_ioc_related = True
+                logger.debug("Skipping IOC update command result storage by command type")
         
         # Update agent's IOC version if this was a successful IOC update
-        if is_ioc_related and "IOC update available" in request.message and request.success:
-            agent = self.storage.get_agent(agent_id)
-            if agent:
-                agent['ioc_version'] = self.ioc_manager.get_version_info()['version']
-                self.storage.save_agent(agent_id, agent)
-                logger.info(f"Updated agent {agent_id} IOC version to {agent['ioc_version']}")
+        if is_ioc_related:
+            if "IOC update available" in result.message and result.success:
+                agent = self.storage.get_agent(agent_id)
+                server_version = self.ioc_manager.get_version_info()['version']
+                # Skip the write if the IOC push already recorded this version
+                if agent and agent.get('ioc_version') != server_version:
+                    self.storage.update_agent(agent_id, {'ioc_version': server_version})
+                    logger.info("Updated agent %s IOC version to %s", agent_id, server_version)
+            return
         
         # Store result only if not IOC related
-        if not is_ioc_related:
-            with self.results_lock:
-                result_dict = {
-                    'command_id': request.command_id,
-                    'agent_id': request.agent_id,
-                    'success': request.success,
-                    'message': request.message,
-                    'execution_time': request.execution_time,
-                    'duration_ms': request.duration_ms
-                }
-                
-                self.command_results[command_id] = result_dict
-                self.save_command_results()
-        
-        # Remove from pending if present
-        with self.stream_lock:
-            if agent_id in self.pending_commands:
-                self.pending_commands[agent_id] = [
-                    cmd for cmd in self.pending_commands[agent_id] 
-                    if cmd.command_id != command_id
-                ]
-        
-        return agent_pb2.CommandAck(
-            command_id=command_id,
-            received=True,
-            message="Result received"
-        )
+        result_dict = {
+            'command_id': command_id,
+            'agent_id': result.agent_id,
+            'success': result.success,
+            'message': result.message,
+            'execution_time': result.execution_time,
+            'duration_ms': result.duration_ms
+        }
+        with self.results_lock:
+            self.save_command_result(command_id, result_dict)
+    
+    def ReportCommandResult(self, request, context):
+        """Handle command result from agent (legacy method)."""
+        command_id = request.command_id
+        self._handle_command_result(request, request.agent_id, legacy=True)
+        
+        ack = agent_pb2.CommandAck()
+        ack.CopyFrom(self._result_ack_template)
+        ack.command_id = command_id
+        return ack
     
     def SendCommand(self, request, context):
         """Send a command to an agent synchronously and wait for results."""
         try:
             command = request.command
             agent_id = command.agent_id
-            cmd_type_name = agent_pb2.CommandType.Name(command.type)
+            cmd_type_name = COMMAND_TYPE_NAMES.get(command.type, str(command.type))
             
             # Validate agent
             agent = self.storage.get_agent(agent_id)
@@ -666,10 +734,10 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
                     message=f"Agent with ID {agent_id} does not exist"
                 )
             
-            logger.info(f"Sending command: ID={command.command_id}, Type={cmd_type_name}, Agent={agent_id}")
+            logger.info("Sending command: ID=%s, Type=%s, Agent=%s", command.command_id, cmd_type_name, agent_id)
             
-            # Validate command params based on command type
-            if command.type == agent_pb2.CommandType.DELETE_FILE and 'path' not in command.params:
+            # Validate command params based on command type (an empty path is as bad as none)
+            if command.type == agent_pb2.CommandType.DELETE_FILE and not command.params.get('path'):
                 return agent_pb2.SendCommandResponse(
                     success=False, 
                     message="DELETE_FILE command missing required 'path' parameter"
@@ -689,19 +757,26 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
                 )
             
             # Add command to queue - allow queuing for all commands when agent is ONLINE
-            with self.stream_lock:
-                # Add command to queue regardless of active stream status
-                command.timestamp = int(time.time())
-                if agent_id not in self.pending_commands:
-                    self.pending_commands[agent_id] = []
-                self.pending_commands[agent_id].append(command)
-                
-                # Log appropriate message based on stream status
-                stream_active = agent_id in self.active_streams and self.active_streams[agent_id] is not None
-                if stream_active:
-                    logger.info(f"Queued {cmd_type_name} command for agent {agent_id} with active stream")
-                else:
-                    logger.info(f"Queued {cmd_type_name} command for ONLINE agent {agent_id} without active stream - will be delivered when stream reconnects")
+            # Add command to queue regardless of active stream status; a full queue pushes back on the caller
+            command.timestamp = int(time.time())
+            
+            # Mark IOC updates before queuing so the result can never arrive unmarked
+            if is_ioc_update:
+                self.ioc_command_ids.add(command.command_id)
+            try:
+                self._get_pending_queue(agent_id).put(command, timeout=1.0)
+            except queue.Full:
+                self.ioc_command_ids.discard(command.command_id)
+                return agent_pb2.SendCommandResponse(
+                    success=False,
+                    message=f"Command queue for agent {agent_id} is full. Try again later."
+                )
+            
+            # Log appropriate message based on stream status (a single dict read, no lock needed)
+            if self.active_streams.get(agent_id) is not None:
+                logger.info("Queued %s command for agent %s with active stream", cmd_type_name, agent_id)
+            else:
+                logger.info("Queued %s command for ONLINE agent %s without active stream - will be delivered when stream reconnects", cmd_type_name, agent_id)
             
             # Return success for all commands - they are now queued
             return agent_pb2.SendCommandResponse(
@@ -710,56 +785,134 @@ class EDRServicer(agent_pb2_grpc.EDRServiceServicer):
             )
             
         except Exception as e:
-            logger.error(f"Error in SendCommand: {e}")
+            logger.error("Error in SendCommand: %s", e)
             return agent_pb2.SendCommandResponse(success=False, message=str(e))
     
+    def ListAgents(self, request, context):
+        """List all registered agents."""
+        # Snapshot under the storage lock so concurrent saves can't resize the dict mid-iteration
+        with self.storage.agent_mutex:
+            revision = self.storage.agents_revision
+            cached = self._list_agents_cache
+            if cached and cached[0] == revision:
+                return agent_pb2.ListAgentsResponse.FromString(cached[1])
+            snapshot = list(self.storage.agents.items())
+        
+        # Unset slots raise AttributeError, so read them with the proto defaults
+        response = agent_pb2.ListAgentsResponse(agents=[
+            agent_pb2.AgentInfo(
+                agent_id=agent_id,
+                hostname=getattr(agent, 'hostname', ''),
+                ip_address=getattr(agent, 'ip_address', ''),
+                mac_address=getattr(agent, 'mac_address', ''),
+                username=getattr(agent, 'username', ''),
+                os_version=getattr(agent, 'os_version', ''),
+                agent_version=getattr(agent, 'agent_version', ''),
+                registration_time=getattr(agent, 'registration_time', 0)
+            )
+            for agent_id, agent in snapshot
+        ])
+        
+        self._list_agents_cache = (revision, response.SerializeToString())
+        return response
+    
     def ReportIOCMatch(self, request, context):
         """Handle IOC match report from agent."""
         report_id = request.report_id
         agent_id = request.agent_id
         
+        type_name = IOC_TYPE_NAMES.get(request.type, str(request.type))
+        action_name = None
+        if request.action_taken != agent_pb2.CommandType.UNKNOWN:
+            action_name = COMMAND_TYPE_NAMES.get(request.action_taken, str(request.action_taken))
+        
         # Log match details
-        logger.info(f"IOC match from agent {agent_id}: {agent_pb2.IOCType.Name(request.type)} - {request.ioc_value}")
-        debug_logger.info(f"Match details: {request.matched_value}, Severity: {request.severity}")
+        logger.info("IOC match from agent %s: %s - %s", agent_id, type_name, request.ioc_value)
+        debug_logger.info("Match details: %s, Severity: %s", request.matched_value, request.severity)
         
-        if request.action_taken != agent_pb2.CommandType.UNKNOWN:
-            action_name = agent_pb2.CommandType.Name(request.action_taken)
-            logger.info(f"Action taken: {action_name} - Success: {request.action_success}")
+        if action_name:
+            logger.info("Action taken: %s - Success: %s", action_name, request.action_success)
         
         # Store the match report
-        match_data = {
-            'report_id': report_id,
-            'agent_id': agent_id,
-            'timestamp': request.timestamp,
-            'type': agent_pb2.IOCType.Name(request.type),
-            'ioc_value': request.ioc_value,
-            'matched_value': request.matched_value,
-            'context': request.context,
-            'severity': request.severity,
-            'action_taken': agent_pb2.CommandType.Name(request.action_taken) if request.action_taken != agent_pb2.CommandType.UNKNOWN else None,
-            'action_success': request.action_success,
-            'action_message': request.action_message,
-            'server_received': int(time.time())
-        }
+        match_data = IOCMatchRecord(
+            report_id=report_id,
+            agent_id=agent_id,
+            timestamp=request.timestamp,
+            type=type_name,
+            ioc_value=request.ioc_value,
+            matched_value=request.matched_value,
+            context=request.context,
+            severity=request.severity,
+            action_taken=action_name,
+            action_success=request.action_success,
+            action_message=request.action_message,
+            server_received=int(time.time())
+        )
         
         self.storage.save_ioc_match(report_id, match_data)
         
-        # Update agent with latest alert information
-        agent = self.storage.get_agent(agent_id)
-        if agent:
-            agent['last_ioc_match'] = {
+        # Update agent with latest alert information (no-op for unknown agents).
+        # In memory only: the match itself is already logged, and ListAgents
+        # doesn't report this field, so there's no WAL write or cache bust per match
+        self.storage.touch_agent(agent_id, {
+            'last_ioc_match': {
                 'timestamp': request.timestamp,
-                'type': agent_pb2.IOCType.Name(request.type),
+                'type': type_name,
                 'ioc_value': request.ioc_value,
                 'severity': request.severity
             }
-            self.storage.save_agent(agent_id, agent)
+        })
         
-        return agent_pb2.IOCMatchAck(
-            report_id=report_id,
-            received=True,
-            message="IOC match report received"
-        )
+        ack = agent_pb2.IOCMatchAck()
+        ack.CopyFrom(self._ioc_match_ack_template)
+        ack.report_id = report_id
+        return ack
+    
+    def StreamIOCs(self, request, context):
+        """Stream the IOC database to an agent in fixed-size chunks.
+        
+        Every chunk carries the same version; the agent merges chunks until
+        the stream ends. An agent that is already current gets a single
+        response with update_available unset.
+        """
+        agent_id = request.agent_id
+        now = int(time.time())
+        
+        # Pick up IOC changes made by other IOCManager instances, then read the
+        # IOCs and the version they belong to together
+        self.ioc_manager.get_version_info()
+        _, server_version, ioc_protos = self.ioc_manager.get_ioc_snapshot()
+        
+        if request.current_version >= server_version:
+            yield agent_pb2.IOCResponse(update_available=False, version=server_version, timestamp=now)
+            return
+        
+        chunk_size = request.chunk_size if request.chunk_size > 0 else IOC_STREAM_CHUNK_SIZE
+        chunk_size = min(chunk_size, IOC_STREAM_CHUNK_MAX)
+        
+        chunk = agent_pb2.IOCResponse(update_available=True, version=server_version, timestamp=now)
+        in_chunk = 0
+        sent_chunks = 0
+        
+        for field in ('ip_addresses', 'file_hashes', 'urls'):
+            for value, ioc_data in ioc_protos[field].items():
+                getattr(chunk, field)[value].CopyFrom(ioc_data)
+                in_chunk += 1
+                if in_chunk == chunk_size:
+                    yield chunk
+                    sent_chunks += 1
+                    chunk = agent_pb2.IOCResponse(update_available=True, version=server_version, timestamp=now)
+                    in_chunk = 0
+        
+        # Flush the remainder, or send an empty update if there are no IOCs at all
+        if in_chunk or sent_chunks == 0:
+            yield chunk
+            sent_chunks += 1
+        
+        ioc_logger.info("Streamed IOC version %s to agent %s in %s chunks", server_version, agent_id, sent_chunks)
+        
+        if agent_id and context.is_active():
+            self.storage.update_agent(agent_id, {'ioc_version': server_version})
 
 def start_grpc_server(port=None, use_tls=None):
     """Start the gRPC server in a background thread.
@@ -777,10 +930,32 @@ def start_grpc_server(port=None, use_tls=None):
     if use_tls is None:
         use_tls = config.GRPC_USE_TLS
         
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
+    # Size the pool for long-lived agent streams plus headroom for unary RPCs
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=config.GRPC_MAX_WORKERS, thread_name_prefix='grpc'),
+        options=[
+            # Storage is file-based and single-writer, so never share the port with another process
+            ('grpc.so_reuseport', 0),
+            ('grpc.max_concurrent_streams', 1024),
+            ('grpc.max_send_message_length', config.GRPC_MAX_MESSAGE_SIZE),
+            ('grpc.max_receive_message_length', config.GRPC_MAX_MESSAGE_SIZE),
+            # Ping idle agent connections so dead streams are noticed and their workers freed
+            ('grpc.keepalive_time_ms', 30000),
+            ('grpc.keepalive_timeout_ms', 10000),
+            ('grpc.keepalive_permit_without_calls', 1),
+        ]
+    )
     servicer = EDRServicer()
     agent_pb2_grpc.add_EDRServiceServicer_to_server(servicer, server)
     
+    # IOC payloads are large; the pure-Python protobuf runtime is far slower than upb/cpp
+    protobuf_impl = api_implementation.Type()
+    if protobuf_impl == 'python':
+        logger.warning("Protobuf is using the pure-Python implementation; IOC serialization will be slow. "
+                       "Install protobuf>=4.21 wheels or unset PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION")
+    else:
+        logger.info(f"Protobuf implementation: {protobuf_impl}")
+    
     # Configure TLS if enabled
     if use_tls:
         # Check for certificate files
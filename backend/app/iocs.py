@@ -4,28 +4,70 @@ Provides functionality to store, manage, and distribute IOCs to agents.
 """
 
 import os
+import re
+import sys
 import json
 import logging
 import hashlib
+import threading
 import time
+from concurrent import futures
 from datetime import datetime
+from ipaddress import AddressValueError, IPv4Address
 from pathlib import Path
 
 from app.config.config import config
-from app.utils.agent_commands import get_online_agents, send_command_to_agent
+from app.utils.agent_commands import create_grpc_client, get_online_agents, queue_command
+from app.utils.json_utils import json_dumps, json_loads
 from app.grpc import agent_pb2
 
 # Configure logging
 logger = logging.getLogger('app.iocs')
 
+# fdatasync skips the metadata flush where the platform supports it
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+# Expected hex digest length per supported hash type
+HASH_LENGTHS = {'md5': 32, 'sha1': 40, 'sha256': 64}
+_HEX_RE = re.compile(r'[0-9a-fA-F]+')
+
+def _intern(value):
+    """Intern a string value, passing anything else through unchanged."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _write_file(file_path, payload):
+    """Atomically replace a file, so the other IOC manager never reads a partial write.
+    
+    The data is synced before the rename, so a crash cannot leave an empty file
+    behind; IOC writes are coalesced, so this costs one sync per flush window.
+    """
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+        f.flush()
+        _fdatasync(f.fileno())
+    os.replace(tmp_path, file_path)
+
+def _import_record(info, added_at, with_hash_type=False):
+    """Build a stored IOC record from an imported one, keeping only the known fields."""
+    record = {
+        'added_at': added_at,
+        'description': _intern(info.get('description', '')),
+        'severity': _intern(info.get('severity', 'medium'))
+    }
+    if with_hash_type:
+        record['hash_type'] = _intern(info.get('hash_type', 'sha256'))
+    return record
+
 class IOCManager:
     """Manager for Indicators of Compromise (IOCs)."""
     
-    def __init__(self, storage_dir='data/iocs'):
+    def __init__(self, storage_dir='data/iocs', flush_delay=1.0):
         """Initialize the IOC manager.
         
         Args:
             storage_dir (str): Directory to store IOC data
+            flush_delay (float): Seconds to coalesce add/remove calls into one write
         """
         self.storage_dir = storage_dir
         self.iocs_file = os.path.join(storage_dir, 'iocs.json')
@@ -48,16 +90,36 @@ class IOCManager:
             'hash': ''
         }
         
+        # Prebuilt IOCData messages and the serialized get_all_iocs() result,
+        # rebuilt lazily after the IOCs change. revision counts those changes
+        # so callers can key their own caches on it
+        self._pb_cache = None
+        self._json_cache = None
+        self.revision = 0
+        
+        # Pending add/remove calls are written together by a timer
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        self._dirty = False
+        self._flush_timer = None
+        
         # Load existing IOCs if available
+        self._loaded_signature = self._file_signature()
         self._load_iocs()
         self._load_version()
     
     def _load_iocs(self):
         """Load IOCs from file."""
+        self._invalidate_caches()
         if os.path.exists(self.iocs_file):
-            with open(self.iocs_file, 'r') as f:
+            with open(self.iocs_file, 'rb') as f:
                 try:
-                    self.iocs = json.load(f)
+                    self.iocs = json_loads(f.read())
+                    # Older files may hold upper case hashes; key them like add_file_hash does
+                    self.iocs['file_hashes'] = {
+                        file_hash.lower(): info for file_hash, info in self.iocs.get('file_hashes', {}).items()
+                    }
+                    self._intern_values()
                     logger.info(f"Loaded IOCs: {self._count_iocs()} total indicators")
                 except json.JSONDecodeError:
                     logger.error("Failed to parse IOCs file, using empty database")
@@ -68,9 +130,9 @@ class IOCManager:
     def _load_version(self):
         """Load version information from file."""
         if os.path.exists(self.version_file):
-            with open(self.version_file, 'r') as f:
+            with open(self.version_file, 'rb') as f:
                 try:
-                    self.version = json.load(f)
+                    self.version = json_loads(f.read())
                     logger.info(f"Loaded IOC version: {self.version['version']}")
                 except json.JSONDecodeError:
                     logger.error("Failed to parse version file, using default")
@@ -84,29 +146,102 @@ class IOCManager:
         Args:
             increment_version (bool): Whether to increment the version number
         """
-        with open(self.iocs_file, 'w') as f:
-            json.dump(self.iocs, f, indent=2)
-        
-        if increment_version:
-            # Update version after saving IOCs
-            self.version['version'] += 1
-            self.version['updated_at'] = int(time.time())
-            self.version['hash'] = self._calculate_hash()
-            self._save_version()
-            logger.info(f"Incremented IOC version to {self.version['version']}")
-        
+        with self._lock:
+            # This write covers any pending changes
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            self._dirty = False
+            
+            payload = json_dumps(self.iocs)
+            _write_file(self.iocs_file, payload)
+            
+            if increment_version:
+                # Update version after saving IOCs; hash the bytes just written
+                self.version['version'] += 1
+                self.version['updated_at'] = int(time.time())
+                self.version['hash'] = self._calculate_hash(payload)
+                self._save_version()
+                self._invalidate_caches()
+                logger.info(f"Incremented IOC version to {self.version['version']}")
+            
+            # Our own write is already in memory; only changes by others should trigger a reload
+            self._loaded_signature = self._file_signature()
         logger.info(f"Saved {self._count_iocs()} IOCs to storage (version {self.version['version']})")
             
+    def _mark_dirty(self):
+        """Schedule a write of the IOC file, coalescing changes made within flush_delay.
+        
+        Must be called with _lock held.
+        """
+        self._invalidate_caches()
+        self._dirty = True
+        if self._flush_timer is None:
+            # Not a daemon, so a pending write still lands when the process exits
+            self._flush_timer = threading.Timer(self.flush_delay, self.flush)
+            self._flush_timer.start()
+    
+    def _invalidate_caches(self):
+        """Drop the caches built from the IOCs after a change. Must be called with _lock held."""
+        self._pb_cache = None
+        self._json_cache = None
+        self.revision += 1
+    
+    def flush(self):
+        """Write pending IOC changes to disk now.
+        
+        Returns:
+            bool: True if there were pending changes to write
+        """
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._save_iocs(increment_version=False)
+            return True
+    
     def _save_version(self):
         """Save version information to file."""
-        with open(self.version_file, 'w') as f:
-            json.dump(self.version, f, indent=2)
+        _write_file(self.version_file, json_dumps(self.version))
+    
+    def _calculate_hash(self, payload=None):
+        """Calculate hash of the IOC database for integrity checking.
+        
+        Args:
+            payload (bytes): Serialized IOCs; defaults to serializing the in-memory IOCs
+            
+        Returns:
+            str: SHA-256 hex digest
+        """
+        if payload is None:
+            payload = json_dumps(self.iocs)
+        return hashlib.sha256(payload).hexdigest()
+    
+    def _file_signature(self):
+        """Get the modification signature of the IOC and version files.
+        
+        Returns:
+            tuple: (mtime_ns, size) per file, or None for a missing file
+        """
+        signature = []
+        for path in (self.iocs_file, self.version_file):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
     
-    def _calculate_hash(self):
-        """Calculate hash of the IOC database for integrity checking."""
-        with open(self.iocs_file, 'r') as f:
-            content = f.read().encode('utf-8')
-            return hashlib.sha256(content).hexdigest()
+    def _intern_values(self):
+        """Share one string object per distinct severity, hash type and description.
+        
+        These values repeat across most IOC records, so interning them keeps a
+        single copy in memory instead of one per record as json.load returns.
+        """
+        for ioc_map in self.iocs.values():
+            for info in ioc_map.values():
+                for key in ('severity', 'hash_type', 'description'):
+                    if key in info:
+                        info[key] = _intern(info[key])
     
     def _count_iocs(self):
         """Count the total number of IOCs in the database."""
@@ -131,14 +266,15 @@ class IOCManager:
             logger.error(f"Invalid IP format: {ip}")
             return False
         
-        self.iocs['ip_addresses'][ip] = {
-            'added_at': int(time.time()),
-            'description': description,
-            'severity': severity
-        }
+        with self._lock:
+            self.iocs['ip_addresses'][ip] = {
+                'added_at': int(time.time()),
+                'description': _intern(description),
+                'severity': _intern(severity)
+            }
+            self._mark_dirty()
         
         logger.info(f"Added IP IOC: {ip} ({severity})")
-        self._save_iocs(increment_version=False)
         return True
     
     def add_file_hash(self, file_hash, hash_type="sha256", description="", severity="medium"):
@@ -157,15 +293,19 @@ class IOCManager:
             logger.error(f"Invalid {hash_type} hash format: {file_hash}")
             return False
         
-        self.iocs['file_hashes'][file_hash] = {
-            'hash_type': hash_type,
-            'added_at': int(time.time()),
-            'description': description,
-            'severity': severity
-        }
+        # Store hashes in lowercase, as agents compute and look them up
+        file_hash = file_hash.lower()
+        
+        with self._lock:
+            self.iocs['file_hashes'][file_hash] = {
+                'hash_type': _intern(hash_type),
+                'added_at': int(time.time()),
+                'description': _intern(description),
+                'severity': _intern(severity)
+            }
+            self._mark_dirty()
         
         logger.info(f"Added {hash_type} hash IOC: {file_hash} ({severity})")
-        self._save_iocs(increment_version=False)
         return True
     
     def add_url(self, url, description="", severity="medium"):
@@ -182,14 +322,15 @@ class IOCManager:
         # Store URLs in lowercase for case-insensitive matching
         url = url.lower()
         
-        self.iocs['urls'][url] = {
-            'added_at': int(time.time()),
-            'description': description,
-            'severity': severity
-        }
+        with self._lock:
+            self.iocs['urls'][url] = {
+                'added_at': int(time.time()),
+                'description': _intern(description),
+                'severity': _intern(severity)
+            }
+            self._mark_dirty()
         
         logger.info(f"Added URL IOC: {url} ({severity})")
-        self._save_iocs(increment_version=False)
         return True
     
     def remove_ioc(self, ioc_type, value):
@@ -202,24 +343,29 @@ class IOCManager:
         Returns:
             bool: True if removed successfully
         """
-        if ioc_type == 'ip' and value in self.iocs['ip_addresses']:
-            del self.iocs['ip_addresses'][value]
-            logger.info(f"Removed IP IOC: {value}")
-            self._save_iocs(increment_version=False)
-            return True
-        elif ioc_type == 'hash' and value in self.iocs['file_hashes']:
-            del self.iocs['file_hashes'][value]
-            logger.info(f"Removed hash IOC: {value}")
-            self._save_iocs(increment_version=False)
-            return True
-        elif ioc_type == 'url' and value in self.iocs['urls']:
-            del self.iocs['urls'][value]
-            logger.info(f"Removed URL IOC: {value}")
-            self._save_iocs(increment_version=False)
-            return True
-        else:
-            logger.warning(f"IOC not found: {ioc_type}:{value}")
-            return False
+        # Hashes and URLs are stored in lowercase
+        if ioc_type in ('hash', 'url'):
+            value = value.lower()
+        
+        with self._lock:
+            if ioc_type == 'ip' and value in self.iocs['ip_addresses']:
+                del self.iocs['ip_addresses'][value]
+                logger.info(f"Removed IP IOC: {value}")
+                self._mark_dirty()
+                return True
+            elif ioc_type == 'hash' and value in self.iocs['file_hashes']:
+                del self.iocs['file_hashes'][value]
+                logger.info(f"Removed hash IOC: {value}")
+                self._mark_dirty()
+                return True
+            elif ioc_type == 'url' and value in self.iocs['urls']:
+                del self.iocs['urls'][value]
+                logger.info(f"Removed URL IOC: {value}")
+                self._mark_dirty()
+                return True
+            else:
+                logger.warning(f"IOC not found: {ioc_type}:{value}")
+                return False
     
     def get_all_iocs(self):
         """Get all IOCs in the database.
@@ -234,6 +380,73 @@ class IOCManager:
             'count': self._count_iocs()
         }
     
+    def get_all_iocs_json(self):
+        """Get get_all_iocs() serialized to JSON.
+        
+        Returns:
+            bytes: JSON body, cached until the IOCs or the version change
+        """
+        cached = self._json_cache
+        if cached is None:
+            # Build under the lock so a concurrent change cannot leave a stale entry behind
+            with self._lock:
+                cached = self._json_cache
+                if cached is None:
+                    cached = json_dumps(self.get_all_iocs())
+                    self._json_cache = cached
+        return cached
+    
+    def get_ioc_protos(self):
+        """Get prebuilt IOCData messages for all IOCs.
+        
+        Returns:
+            dict: 'ip_addresses', 'file_hashes' and 'urls' maps of value -> IOCData
+        """
+        pb_cache = self._pb_cache
+        if pb_cache is None:
+            # Build under the lock, so a reload can't be overwritten with protos from the old IOCs
+            with self._lock:
+                pb_cache = self._pb_cache
+                if pb_cache is None:
+                    pb_cache = {
+                        'ip_addresses': {
+                            ip: agent_pb2.IOCData(
+                                value=ip,
+                                description=info.get('description', ''),
+                                severity=info.get('severity', 'medium')
+                            )
+                            for ip, info in self.iocs.get('ip_addresses', {}).items()
+                        },
+                        'file_hashes': {
+                            file_hash: agent_pb2.IOCData(
+                                value=file_hash,
+                                description=info.get('description', ''),
+                                severity=info.get('severity', 'medium'),
+                                metadata={'hash_type': info['hash_type']} if 'hash_type' in info else {}
+                            )
+                            for file_hash, info in self.iocs.get('file_hashes', {}).items()
+                        },
+                        'urls': {
+                            url: agent_pb2.IOCData(
+                                value=url,
+                                description=info.get('description', ''),
+                                severity=info.get('severity', 'medium')
+                            )
+                            for url, info in self.iocs.get('urls', {}).items()
+                        }
+                    }
+                    self._pb_cache = pb_cache
+        return pb_cache
+    
+    def get_ioc_snapshot(self):
+        """Get the prebuilt IOCData messages with the revision and version they belong to.
+        
+        Returns:
+            tuple: (revision, version, get_ioc_protos() maps), read together under the lock
+        """
+        with self._lock:
+            return self.revision, self.version['version'], self.get_ioc_protos()
+    
     def get_iocs_by_type(self, ioc_type):
         """Get IOCs of a specific type.
         
@@ -259,8 +472,10 @@ class IOCManager:
         Returns:
             dict: Version information
         """
-        # Reload from disk to make sure we have the latest version
-        self._load_version()
+        # Pick up changes from other IOCManager instances; this only touches
+        # the disk when the IOC or version file has changed since the last load,
+        # and reloads both so the IOCs always match the version reported
+        self.reload_if_changed()
         return self.version
     
     def import_iocs_from_file(self, file_path):
@@ -273,8 +488,8 @@ class IOCManager:
             dict: Import results
         """
         try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
+            with open(file_path, 'rb') as f:
+                data = json_loads(f.read())
             
             results = {
                 'imported': 0,
@@ -282,36 +497,37 @@ class IOCManager:
                 'duplicates': 0
             }
             
-            # Import IP addresses
-            if 'ip_addresses' in data:
-                for ip, info in data['ip_addresses'].items():
-                    if ip in self.iocs['ip_addresses']:
-                        results['duplicates'] += 1
-                    elif self.add_ip(ip, info.get('description', ''), info.get('severity', 'medium')):
-                        results['imported'] += 1
-                    else:
-                        results['failed'] += 1
-            
-            # Import file hashes
-            if 'file_hashes' in data:
-                for file_hash, info in data['file_hashes'].items():
-                    if file_hash in self.iocs['file_hashes']:
-                        results['duplicates'] += 1
-                    elif self.add_file_hash(file_hash, info.get('hash_type', 'sha256'), 
-                                          info.get('description', ''), info.get('severity', 'medium')):
-                        results['imported'] += 1
-                    else:
-                        results['failed'] += 1
+            # Keep well-formed indicators only; hashes and URLs are stored lowercase
+            raw = {section: data.get(section, {}) for section in ('ip_addresses', 'file_hashes', 'urls')}
+            valid_hashes = {file_hash: info for file_hash, info in raw['file_hashes'].items()
+                            if self._validate_hash(file_hash, info.get('hash_type', 'sha256'))}
+            incoming = {
+                'ip_addresses': {ip: info for ip, info in raw['ip_addresses'].items()
+                                 if self._validate_ip(ip)},
+                'file_hashes': {file_hash.lower(): info for file_hash, info in valid_hashes.items()},
+                'urls': {url.lower(): info for url, info in raw['urls'].items()}
+            }
+            results['failed'] = (len(raw['ip_addresses']) - len(incoming['ip_addresses']) +
+                                 len(raw['file_hashes']) - len(valid_hashes))
+            # Case variants of the same hash or URL within the file
+            results['duplicates'] = (len(valid_hashes) - len(incoming['file_hashes']) +
+                                     len(raw['urls']) - len(incoming['urls']))
             
-            # Import URLs
-            if 'urls' in data:
-                for url, info in data['urls'].items():
-                    if url in self.iocs['urls']:
-                        results['duplicates'] += 1
-                    elif self.add_url(url, info.get('description', ''), info.get('severity', 'medium')):
-                        results['imported'] += 1
-                    else:
-                        results['failed'] += 1
+            added_at = int(time.time())
+            with self._lock:
+                for section, iocs in incoming.items():
+                    existing = self.iocs[section]
+                    # One key-set intersection instead of a lookup per indicator
+                    duplicates = existing.keys() & iocs.keys()
+                    results['duplicates'] += len(duplicates)
+                    for value, info in iocs.items():
+                        if value not in duplicates:
+                            existing[value] = _import_record(info, added_at, section == 'file_hashes')
+                    results['imported'] += len(iocs) - len(duplicates)
+                
+                # One write for the whole import instead of waiting for the timer
+                if results['imported']:
+                    self._save_iocs(increment_version=False)
             
             logger.info(f"Import results: {results}")
             return results
@@ -325,18 +541,19 @@ class IOCManager:
                 'error': str(e)
             }
     
-    def export_iocs_to_file(self, file_path):
+    def export_iocs_to_file(self, file_path, pretty=False):
         """Export IOCs to a JSON file.
         
         Args:
             file_path (str): Path to save the JSON file
+            pretty (bool): Indent the output for reading by hand
             
         Returns:
             bool: True if exported successfully
         """
         try:
-            with open(file_path, 'w') as f:
-                json.dump(self.iocs, f, indent=2)
+            with open(file_path, 'wb') as f:
+                f.write(json_dumps(self.iocs, pretty=pretty))
             
             logger.info(f"Exported {self._count_iocs()} IOCs to {file_path}")
             return True
@@ -354,20 +571,16 @@ class IOCManager:
         Returns:
             bool: True if valid
         """
-        # Simple validation - improve as needed
-        parts = ip.split('.')
-        if len(parts) != 4:
+        # IPv4Address also accepts packed ints and bytes, which can't be JSON keys
+        if not isinstance(ip, str):
             return False
         
-        for part in parts:
-            try:
-                num = int(part)
-                if num < 0 or num > 255:
-                    return False
-            except ValueError:
-                return False
-        
-        return True
+        # The stdlib parser also rejects leading zeros and stray whitespace
+        try:
+            IPv4Address(ip)
+            return True
+        except (AddressValueError, ValueError):
+            return False
     
     def _validate_hash(self, file_hash, hash_type):
         """Validate hash format.
@@ -379,14 +592,9 @@ class IOCManager:
         Returns:
             bool: True if valid
         """
-        if hash_type == 'md5':
-            return len(file_hash) == 32 and all(c in '0123456789abcdefABCDEF' for c in file_hash)
-        elif hash_type == 'sha1':
-            return len(file_hash) == 40 and all(c in '0123456789abcdefABCDEF' for c in file_hash)
-        elif hash_type == 'sha256':
-            return len(file_hash) == 64 and all(c in '0123456789abcdefABCDEF' for c in file_hash)
-        else:
-            return False
+        # int(file_hash, 16) would also accept '0x', signs and underscores
+        return (len(file_hash) == HASH_LENGTHS.get(hash_type)
+                and _HEX_RE.fullmatch(file_hash) is not None)
     
     def send_updates_to_agents(self):
         """Manually send IOC updates to all connected agents."""
@@ -401,28 +609,40 @@ class IOCManager:
             # Log attempt to send notifications
             logger.info(f"Sending IOC update command to {len(online_agents)} agents (version {self.version['version']})")
             
-            # Send UPDATE_IOCS command to trigger immediate IOC data streaming
+            # Send UPDATE_IOCS command to trigger immediate IOC data streaming.
+            # SendCommand only queues the command on the agent's stream, so the
+            # RPCs can overlap instead of running one after another. The online
+            # agents were resolved above, where the app context is available, so
+            # the workers skip that check and share one channel
+            client = create_grpc_client()
             success_count = 0
-            for agent_id in online_agents:
-                try:
-                    # Add a small delay between agent requests to prevent race conditions
-                    time.sleep(0.2)
-                    
-                    success, message, command_id = send_command_to_agent(
+            with futures.ThreadPoolExecutor(max_workers=min(32, len(online_agents)),
+                                            thread_name_prefix='ioc-update') as executor:
+                pending = {
+                    executor.submit(
+                        queue_command,
                         agent_id=agent_id,
                         command_type=agent_pb2.CommandType.UPDATE_IOCS,
                         params={},
                         priority=1,
-                        timeout=120
-                    )
-                    
-                    if success:
-                        logger.info(f"IOC update command queued for agent {agent_id} (command ID: {command_id})")
-                        success_count += 1
-                    else:
-                        logger.warning(f"Failed to queue IOC update for agent {agent_id}: {message}")
-                except Exception as e:
-                    logger.error(f"Exception sending IOC update to agent {agent_id}: {e}")
+                        timeout=120,
+                        client=client
+                    ): agent_id
+                    for agent_id in online_agents
+                }
+                
+                for future in futures.as_completed(pending):
+                    agent_id = pending[future]
+                    try:
+                        success, message, command_id = future.result()
+                        
+                        if success:
+                            logger.info(f"IOC update command queued for agent {agent_id} (command ID: {command_id})")
+                            success_count += 1
+                        else:
+                            logger.warning(f"Failed to queue IOC update for agent {agent_id}: {message}")
+                    except Exception as e:
+                        logger.error(f"Exception sending IOC update to agent {agent_id}: {e}")
             
             logger.info(f"IOC update commands sent to {success_count}/{len(online_agents)} agents for version {self.version['version']}")
             return success_count, f"Updates sent to {success_count}/{len(online_agents)} agents"
@@ -434,7 +654,22 @@ class IOCManager:
     def reload_data(self):
         """Reload all IOC data and version information from disk."""
         logger.info("Reloading IOC data and version from disk")
-        self._load_iocs()
-        self._load_version()
+        with self._lock:
+            self._loaded_signature = self._file_signature()
+            self._load_iocs()
+            self._load_version()
         logger.info(f"Reloaded IOC data: {self._count_iocs()} indicators, version {self.version['version']}")
         return True
+    
+    def reload_if_changed(self):
+        """Reload IOC data only if the files on disk changed since the last load.
+        
+        Returns:
+            bool: True if the data was reloaded
+        """
+        with self._lock:
+            # Write our pending changes first so the reload does not discard them
+            self.flush()
+            if self._file_signature() == self._loaded_signature:
+                return False
+            return self.reload_data()
@@ -16,7 +16,8 @@ class AgentPingMonitor:
     """Background service to monitor agent ping timeouts."""
     
     def __init__(self):
-        self.storage = FileStorage()
+        # Set in start() so the monitor shares the gRPC servicer's storage
+        self.storage = None
         self.running = False
         self.monitor_thread = None
         
@@ -26,11 +27,21 @@ class AgentPingMonitor:
         # Check interval in seconds (1 minute)
         self.check_interval = 60
         
-    def start(self):
-        """Start the ping monitor service."""
+    def start(self, storage=None):
+        """Start the ping monitor service.
+        
+        Args:
+            storage (FileStorage, optional): Storage to monitor. Should be the gRPC
+                servicer's storage so both see the same in-memory agents.
+        """
         if self.running:
             logger.warning("Ping monitor is already running")
             return
+        
+        if storage is not None:
+            self.storage = storage
+        elif self.storage is None:
+            self.storage = FileStorage()
             
         self.running = True
         self.monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
@@ -83,11 +94,10 @@ class AgentPingMonitor:
                     logger.info(f"Agent {agent_id} ping timeout - last seen {current_time - last_seen}s ago, marking as OFFLINE")
                     
                     # Update agent status to OFFLINE
-                    agent['status'] = 'OFFLINE'
-                    agent['last_offline'] = current_time
-                    
-                    # Save the updated agent
-                    self.storage.save_agent(agent_id, agent)
+                    self.storage.update_agent(agent_id, {
+                        'status': 'OFFLINE',
+                        'last_offline': current_time
+                    })
                     offline_count += 1
                     
             if offline_count > 0:
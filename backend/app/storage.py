@@ -7,19 +7,197 @@ import json
 import time
 import threading
 from app.logging_setup import get_logger
+from app.utils.json_utils import json_dumps, json_loads
+
+# Optional: stream very large agents.json snapshots instead of parsing them in one go
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Set up logging
 logger = get_logger('app.storage')
 debug_logger = get_logger('app.storage.debug')
 
+# fdatasync skips the metadata flush where the platform supports it
+_fdatasync = getattr(os, 'fdatasync', os.fsync)
+
+def replay_log(log_file, records):
+    """Apply entries from an append-only record log on top of a records dict.
+    
+    Args:
+        log_file (str): Path to a log of {"id": ..., "data": ...} lines
+        records (dict): Record ID -> data, updated in place
+        
+    Returns:
+        int: Number of entries applied
+    """
+    if not os.path.exists(log_file):
+        return 0
+    
+    applied = 0
+    with open(log_file, 'rb') as f:
+        for line in f:
+            try:
+                entry = json_loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from a crash; everything before it is valid
+                continue
+            records[entry['id']] = entry['data']
+            applied += 1
+    return applied
+
+def _read_logged_json(snapshot_file, log_file):
+    """Read a JSON snapshot plus the records logged since it was written."""
+    # Read the log first: compaction replaces the snapshot before truncating the log,
+    # so this order never misses a record
+    logged = {}
+    replay_log(log_file, logged)
+    
+    try:
+        with open(snapshot_file, 'rb') as f:
+            records = json_loads(f.read())
+    except FileNotFoundError:
+        # Nothing compacted yet; everything is still in the log
+        records = {}
+    if isinstance(records, list):
+        # Old list-format snapshot
+        return records + list(logged.values())
+    records.update(logged)
+    return records
+
+def read_command_results(storage_dir):
+    """Read all command results from disk: the snapshot plus newer logged results.
+    
+    Args:
+        storage_dir (str): Data directory holding command_results.json
+        
+    Returns:
+        dict: Command ID -> result data
+    """
+    return _read_logged_json(os.path.join(storage_dir, 'command_results.json'),
+                             os.path.join(storage_dir, 'command_results.log'))
+
+def read_ioc_matches(storage_dir):
+    """Read all IOC matches from disk: the snapshot plus newer logged matches.
+    
+    Args:
+        storage_dir (str): Data directory holding ioc_matches.json
+        
+    Returns:
+        dict: Report ID -> match data
+    """
+    return _read_logged_json(os.path.join(storage_dir, 'ioc_matches.json'),
+                             os.path.join(storage_dir, 'ioc_matches.log'))
+
+class IOCMatchRecord:
+    """Compact IOC match report, buffered until it is written to disk."""
+    
+    __slots__ = (
+        'report_id', 'agent_id', 'timestamp', 'type', 'ioc_value', 'matched_value',
+        'context', 'severity', 'action_taken', 'action_success', 'action_message',
+        'server_received'
+    )
+    
+    def __init__(self, report_id, agent_id, timestamp, type, ioc_value, matched_value,
+                 context, severity, action_taken, action_success, action_message,
+                 server_received):
+        self.report_id = report_id
+        self.agent_id = agent_id
+        self.timestamp = timestamp
+        self.type = type
+        self.ioc_value = ioc_value
+        self.matched_value = matched_value
+        self.context = context
+        self.severity = severity
+        self.action_taken = action_taken
+        self.action_success = action_success
+        self.action_message = action_message
+        self.server_received = server_received
+    
+    def to_dict(self):
+        """Convert the record to the dict stored in ioc_matches.json."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+_MISSING = object()
+
+class AgentRecord:
+    """Agent record with the fields every agent carries stored in slots.
+    
+    Rarely set fields (last_offline, last_ioc_match, ...) go in a small overflow
+    dict. Supports the dict operations callers use (get, [], in, update), so
+    records can be handled like the plain dicts they replace.
+    """
+    
+    FIELDS = (
+        'agent_id', 'hostname', 'ip_address', 'mac_address', 'username', 'os_version',
+        'agent_version', 'registration_time', 'last_seen', 'status', 'ioc_version',
+        'cpu_usage', 'memory_usage', 'uptime'
+    )
+    _FIELD_SET = frozenset(FIELDS)
+    
+    __slots__ = FIELDS + ('_extra',)
+    
+    def __init__(self, **fields):
+        self._extra = None
+        # Fields never set stay unset slots, so get() returns the caller's default
+        self.update(fields)
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Create a record from the dict stored in agents.json."""
+        return cls(**data)
+    
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            return getattr(self, key, default)
+        if self._extra is None:
+            return default
+        return self._extra.get(key, default)
+    
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def update(self, fields):
+        for key, value in fields.items():
+            self[key] = value
+    
+    def to_dict(self):
+        """Convert the record to the dict stored in agents.json."""
+        data = {}
+        for name in self.FIELDS:
+            value = getattr(self, name, _MISSING)
+            if value is not _MISSING:
+                data[name] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
+
 class FileStorage:
     """Storage for agent data using JSON files."""
     
     def __init__(self, storage_dir='data'):
         self.storage_dir = storage_dir
         self.agents_file = os.path.join(storage_dir, 'agents.json')
+        self.agents_wal_file = os.path.join(storage_dir, 'agents.wal')
         self.results_file = os.path.join(storage_dir, 'command_results.json')
+        self.results_log_file = os.path.join(storage_dir, 'command_results.log')
         self.ioc_matches_file = os.path.join(storage_dir, 'ioc_matches.json')
+        self.ioc_matches_log_file = os.path.join(storage_dir, 'ioc_matches.log')
         
         # Create storage directory
         os.makedirs(storage_dir, exist_ok=True)
@@ -31,11 +209,47 @@ class FileStorage:
         # For optimized saving
         self.dirty_agents = False
         self.last_save_time = 0
-        self.save_interval = 60  # Save at most once per minute
+        self.save_interval = 30  # Snapshot at most every 30 seconds
         self.agent_mutex = threading.RLock()
         
+        # Append-only log of agent writes since the last snapshot. Records are
+        # queued by request threads and written in batches by one writer thread.
+        self._wal = None
+        self._wal_records = 0
+        self._wal_pending = []
+        self._wal_lock = threading.Lock()  # Guards _wal_pending and _wal_records
+        self._wal_io_lock = threading.Lock()  # Serializes file writes and truncation
+        self._wal_ready = threading.Event()
+        self.wal_max_records = 10000  # Snapshot early once the log gets this long
+        self.wal_flush_interval = 0.2  # Seconds to gather heartbeats into one synced write
+        self.stream_load_threshold = 32 * 1024 * 1024  # Snapshot size above which ijson is used
+        
+        # IOC matches are buffered and appended to a log in batches by a flusher thread;
+        # the log is folded into ioc_matches.json every so many matches
+        self.match_mutex = threading.Lock()
+        self.match_flush_interval = 0.1  # Seconds to gather a batch before writing
+        self.match_compact_records = 1000
+        self._match_log_records = 0
+        self._match_buf = []
+        self._match_buf_lock = threading.Lock()
+        self._match_pending = threading.Event()
+        
+        # Bumped on every agent write so readers can cache derived views
+        self.agents_revision = 0
+        
         # Load existing data
         self._load_data()
+        self._open_wal()
+        if self.dirty_agents:
+            self._save_agents(force=True)
+        
+        # Write the log and fold it into agents.json in the background
+        self._wal_writer_thread = threading.Thread(target=self._wal_writer_loop, daemon=True)
+        self._wal_writer_thread.start()
+        self._snapshot_thread = threading.Thread(target=self._snapshot_loop, daemon=True)
+        self._snapshot_thread.start()
+        self._match_flush_thread = threading.Thread(target=self._match_flush_loop, daemon=True)
+        self._match_flush_thread.start()
         logger.info(f"FileStorage initialized at {storage_dir}")
     
     def _load_data(self):
@@ -43,13 +257,131 @@ class FileStorage:
         self._load_agents()
         self._load_ioc_matches()
         
-        # Ensure command results file exists
+        # Ensure command results and IOC matches files exist
         if not os.path.exists(self.results_file):
             self._save_json({}, self.results_file)
+        if not os.path.exists(self.ioc_matches_file):
+            self._save_json({}, self.ioc_matches_file)
     
     def _load_agents(self):
-        """Load agents from file."""
-        self.agents = self._load_json(self.agents_file, "agents")
+        """Load agents from the snapshot file and replay the write-ahead log."""
+        self.agents = {agent_id: AgentRecord.from_dict(agent_data)
+                       for agent_id, agent_data in self._load_agents_snapshot().items()}
+        
+        if not os.path.exists(self.agents_wal_file):
+            return
+        
+        replayed = 0
+        try:
+            with open(self.agents_wal_file, 'rb') as f:
+                for line in f:
+                    try:
+                        record = json_loads(line)
+                    except json.JSONDecodeError:
+                        # A torn last line from a crash; everything before it is valid
+                        logger.warning("Skipping corrupt record in agents write-ahead log")
+                        continue
+                    if 'fields' in record:
+                        # Partial update of hot fields on an already-known agent
+                        if record['id'] in self.agents:
+                            self.agents[record['id']].update(record['fields'])
+                    else:
+                        self.agents[record['id']] = AgentRecord.from_dict(record['data'])
+                    replayed += 1
+        except Exception as e:
+            logger.error(f"Error replaying agents write-ahead log: {e}")
+        
+        if replayed:
+            logger.info(f"Replayed {replayed} agent updates from write-ahead log")
+        
+        # Any leftover log (including a torn tail) gets folded into a fresh snapshot
+        if os.path.getsize(self.agents_wal_file) > 0:
+            self.dirty_agents = True
+    
+    def _load_agents_snapshot(self):
+        """Load the agents snapshot, streaming it one agent at a time when it is large."""
+        if (ijson is None or not os.path.exists(self.agents_file)
+                or os.path.getsize(self.agents_file) < self.stream_load_threshold):
+            return self._load_json(self.agents_file, "agents")
+        
+        agents = {}
+        try:
+            with open(self.agents_file, 'rb') as f:
+                for agent_id, agent_data in ijson.kvitems(f, '', use_float=True):
+                    agents[agent_id] = agent_data
+            logger.info(f"Streamed {len(agents)} agents from snapshot")
+            return agents
+        except Exception as e:
+            logger.error(f"Error streaming agents snapshot, falling back to full load: {e}")
+            return self._load_json(self.agents_file, "agents")
+    
+    def _open_wal(self):
+        """Open the agents write-ahead log for appending."""
+        try:
+            self._wal = open(self.agents_wal_file, 'ab')
+        except Exception as e:
+            logger.error(f"Error opening agents write-ahead log: {e}")
+            self._wal = None
+    
+    def _append_wal(self, agent_id, agent_data, partial=False):
+        """Queue a single agent write for the write-ahead log.
+        
+        Args:
+            agent_id (str): ID of the agent that changed
+            agent_data (dict): Full agent record, or only the changed fields if partial
+            partial (bool): Whether agent_data holds only the changed fields
+        """
+        if self._wal is None:
+            # Without a log, the change reaches disk with the next periodic snapshot
+            return True
+        
+        try:
+            record = {'id': agent_id, 'fields' if partial else 'data': agent_data}
+            line = json_dumps(record) + b'\n'
+        except Exception as e:
+            # The change is still in memory and reaches disk with the next snapshot
+            logger.error(f"Error serializing agent update for write-ahead log: {e}")
+            return False
+        
+        with self._wal_lock:
+            self._wal_pending.append(line)
+            self._wal_records += 1
+        self._wal_ready.set()
+        return True
+    
+    def _flush_wal(self):
+        """Write all queued log records with a single write and sync."""
+        with self._wal_io_lock:
+            with self._wal_lock:
+                batch = self._wal_pending
+                self._wal_pending = []
+                self._wal_ready.clear()
+            
+            if not batch or self._wal is None:
+                return True
+            
+            try:
+                self._wal.write(b''.join(batch))
+                self._wal.flush()
+                _fdatasync(self._wal.fileno())
+                return True
+            except Exception as e:
+                # The updates are still in memory and reach disk with the next snapshot
+                logger.error(f"Error writing agents write-ahead log: {e}")
+                return False
+    
+    def _wal_writer_loop(self):
+        """Write queued log records shortly after the first one arrives."""
+        while True:
+            self._wal_ready.wait()
+            time.sleep(self.wal_flush_interval)
+            self._flush_wal()
+    
+    def _snapshot_loop(self):
+        """Periodically rewrite agents.json from memory and truncate the log."""
+        while True:
+            time.sleep(self.save_interval)
+            self._save_agents(force=True)
     
     def _load_ioc_matches(self):
         """Load IOC matches from file."""
@@ -59,6 +391,14 @@ class FileStorage:
             logger.warning(f"IOC matches data is not a dictionary, resetting to empty dictionary")
             self.ioc_matches = {}
             self._save_json(self.ioc_matches, self.ioc_matches_file)
+        
+        # Apply matches logged since the last snapshot
+        try:
+            self._match_log_records = replay_log(self.ioc_matches_log_file, self.ioc_matches)
+            if self._match_log_records:
+                logger.info(f"Replayed {self._match_log_records} IOC matches from log")
+        except Exception as e:
+            logger.error(f"Error replaying IOC matches log: {e}")
     
     def _load_json(self, file_path, data_type="data"):
         """Generic JSON file loader with error handling."""
@@ -67,8 +407,8 @@ class FileStorage:
             return {}
             
         try:
-            with open(file_path, 'r') as f:
-                return json.load(f)
+            with open(file_path, 'rb') as f:
+                return json_loads(f.read())
         except json.JSONDecodeError:
             logger.error(f"Failed to parse {data_type} file, using empty database")
             return {}
@@ -76,58 +416,199 @@ class FileStorage:
             logger.error(f"Error loading {data_type}: {e}")
             return {}
     
-    def _save_json(self, data, file_path):
-        """Generic JSON file saver with error handling."""
+    def _save_json(self, data, file_path, durable=False):
+        """Generic JSON file saver with error handling.
+        
+        Args:
+            data: JSON-serializable data
+            file_path (str): Destination file
+            durable (bool): Sync the data to disk before the rename, for snapshots
+                that replace a log which is truncated afterwards
+        """
         try:
-            with open(file_path, 'w') as f:
-                json.dump(data, f, indent=2)
+            # Write to a temp file and rename so readers never see a partial file;
+            # the payload is already bytes, so skip buffered IO
+            tmp_path = f"{file_path}.tmp"
+            payload = memoryview(json_dumps(data))
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                while payload:
+                    payload = payload[os.write(fd, payload):]
+                if durable:
+                    _fdatasync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, file_path)
             return True
         except Exception as e:
             logger.error(f"Error saving to {file_path}: {e}")
             return False
     
     def _save_agents(self, force=False):
-        """Save agents to file with batching.
+        """Snapshot agents to file and truncate the write-ahead log.
+        
+        Only copying the records happens under agent_mutex; the file is written
+        outside it, so agent reads and updates never wait on disk IO. Must not be
+        called with agent_mutex held.
         
         Args:
             force (bool): Force save regardless of time elapsed
         """
-        with self.agent_mutex:
-            current_time = time.time()
-            elapsed = current_time - self.last_save_time
+        # The log writer stays paused until the snapshot has replaced what the log covers
+        with self._wal_io_lock:
+            with self.agent_mutex:
+                current_time = time.time()
+                elapsed = current_time - self.last_save_time
+                
+                # Only save if dirty and either forced or enough time has passed
+                if not (self.dirty_agents and (force or elapsed >= self.save_interval)):
+                    return True  # No save needed
+                
+                snapshot = {agent_id: agent.to_dict() for agent_id, agent in self.agents.items()}
+                self.dirty_agents = False
+                
+                # Records queued so far are part of the snapshot; later ones stay queued
+                with self._wal_lock:
+                    covered = self._wal_pending
+                    covered_records = self._wal_records
+                    self._wal_pending = []
+                    self._wal_records = 0
             
-            # Only save if dirty and either forced or enough time has passed
-            if self.dirty_agents and (force or elapsed >= self.save_interval):
-                # print(f"[DEBUG] Actually saving to file (elapsed: {elapsed}s)")
-                success = self._save_json(self.agents, self.agents_file)
+            if not self._save_json(snapshot, self.agents_file, durable=True):
+                # Keep the log complete and retry with the next snapshot
+                with self.agent_mutex:
+                    self.dirty_agents = True
+                with self._wal_lock:
+                    self._wal_pending[:0] = covered
+                    self._wal_records += covered_records
+                return False
+            
+            self.last_save_time = current_time
+            if self._wal is not None:
+                try:
+                    self._wal.truncate(0)
+                except Exception as e:
+                    logger.error(f"Error truncating agents write-ahead log: {e}")
+            debug_logger.debug(f"Saved {len(snapshot)} agents to storage (elapsed: {int(elapsed)}s)")
+            return True
+    
+    def save_ioc_match(self, match_id, match_data):
+        """Queue IOC match data for the next batched write."""
+        with self._match_buf_lock:
+            self._match_buf.append((match_id, match_data))
+            self._match_pending.set()
+        return True
+    
+    def save_ioc_matches_batch(self, items):
+        """Save a batch of IOC matches with a single append to the matches log.
+        
+        Args:
+            items (list): (match_id, match_data) pairs
+        """
+        with self.match_mutex:
+            try:
+                # Ensure ioc_matches is a dictionary
+                if not isinstance(self.ioc_matches, dict):
+                    logger.error(f"ioc_matches is not a dictionary: {type(self.ioc_matches)}")
+                    self.ioc_matches = {}
+                
+                # Records are only expanded to dicts here, at persistence time
+                entries = [
+                    (match_id, match_data.to_dict() if isinstance(match_data, IOCMatchRecord) else match_data)
+                    for match_id, match_data in items
+                ]
+                self.ioc_matches.update(entries)
+                
+                if self._match_log_records + len(entries) >= self.match_compact_records:
+                    success = self._compact_ioc_matches()
+                else:
+                    success = self._append_log(self.ioc_matches_log_file, entries)
+                    if success:
+                        self._match_log_records += len(entries)
+                    else:
+                        # Make the next batch write a full snapshot instead
+                        self._match_log_records = self.match_compact_records
                 if success:
-                    self.dirty_agents = False
-                    self.last_save_time = current_time
-                    debug_logger.debug(f"Saved {len(self.agents)} agents to storage (elapsed: {int(elapsed)}s)")
+                    debug_logger.info(f"Saved {len(items)} IOC matches to storage")
                 return success
-            else:
-                pass
-                # print(f"[DEBUG] Skipping save - elapsed: {elapsed}s, dirty: {self.dirty_agents}, force: {force}")
-            return True  # No save needed
+            except Exception as e:
+                logger.error(f"Error saving IOC matches: {e}")
+                # Try to recover by resetting to just this batch
+                self.ioc_matches = {
+                    match_id: match_data.to_dict() if isinstance(match_data, IOCMatchRecord) else match_data
+                    for match_id, match_data in items
+                }
+                return self._compact_ioc_matches()
     
-    def save_ioc_match(self, match_id, match_data):
-        """Save IOC match data."""
+    def _compact_ioc_matches(self):
+        """Write all IOC matches to ioc_matches.json and clear the matches log."""
+        if not self._save_json(self.ioc_matches, self.ioc_matches_file, durable=True):
+            return False
         try:
-            # Ensure ioc_matches is a dictionary
-            if not isinstance(self.ioc_matches, dict):
-                logger.error(f"ioc_matches is not a dictionary: {type(self.ioc_matches)}")
-                self.ioc_matches = {}
-            
-            self.ioc_matches[match_id] = match_data
-            success = self._save_json(self.ioc_matches, self.ioc_matches_file)
-            if success:
-                debug_logger.info(f"Saved IOC match {match_id} to storage")
-            return success
+            open(self.ioc_matches_log_file, 'wb').close()
+            self._match_log_records = 0
+        except Exception as e:
+            logger.error(f"Error truncating IOC matches log: {e}")
+        return True
+    
+    def _append_log(self, log_file, entries):
+        """Append (id, data) entries to a record log with a single write.
+        
+        Args:
+            log_file (str): Path to the log
+            entries (list): (record_id, data) pairs
+        """
+        try:
+            lines = b''.join(json_dumps({'id': record_id, 'data': data}) + b'\n'
+                             for record_id, data in entries)
+            with open(log_file, 'ab') as f:
+                f.write(lines)
+            return True
+        except Exception as e:
+            logger.error(f"Error appending to {log_file}: {e}")
+            return False
+    
+    def _flush_ioc_matches(self):
+        """Write out all buffered IOC matches."""
+        with self._match_buf_lock:
+            batch = self._match_buf
+            self._match_buf = []
+            self._match_pending.clear()
+        
+        if not batch:
+            return True
+        return self.save_ioc_matches_batch(batch)
+    
+    def _match_flush_loop(self):
+        """Flush buffered IOC matches shortly after the first one arrives."""
+        while True:
+            self._match_pending.wait()
+            time.sleep(self.match_flush_interval)
+            self._flush_ioc_matches()
+    
+    def append_command_results(self, items):
+        """Append a batch of command results to the results log with a single write.
+        
+        Args:
+            items (list): (command_id, result_data) pairs
+        """
+        return self._append_log(self.results_log_file, items)
+    
+    def save_command_results(self, results):
+        """Write the full command results snapshot to file and clear the results log.
+        
+        Args:
+            results (dict): Command ID -> result data
+        """
+        if not self._save_json(results, self.results_file, durable=True):
+            return False
+        
+        try:
+            # Everything in the log is now part of the snapshot
+            open(self.results_log_file, 'wb').close()
         except Exception as e:
-            logger.error(f"Error saving IOC match: {e}")
-            # Try to recover by resetting to empty dict
-            self.ioc_matches = {match_id: match_data}
-            return self._save_json(self.ioc_matches, self.ioc_matches_file)
+            logger.error(f"Error truncating command results log: {e}")
+        return True
     
     def get_agent(self, agent_id):
         """Get an agent by ID."""
@@ -140,17 +621,79 @@ class FileStorage:
             return self.agents.copy()
     
     def save_agent(self, agent_id, agent_data):
-        """Save agent data with optimized writes."""
+        """Save agent data with optimized writes.
+        
+        Args:
+            agent_id (str): Agent ID
+            agent_data (AgentRecord or dict): Full agent record
+        """
+        if not isinstance(agent_data, AgentRecord):
+            agent_data = AgentRecord.from_dict(agent_data)
         with self.agent_mutex:
             self.agents[agent_id] = agent_data
             self.dirty_agents = True
-            # print(f"[DEBUG] save_agent called for {agent_id}, status: {agent_data.get('status')}")
+            self.agents_revision += 1
+            
+            # Log the write; the snapshot thread rewrites agents.json
+            result = self._append_wal(agent_id, agent_data.to_dict())
+            snapshot_due = self._wal_records >= self.wal_max_records
+        
+        if snapshot_due:
+            self._save_agents(force=True)
+        return result
+    
+    def update_agent(self, agent_id, fields):
+        """Update selected fields of an existing agent, logging only those fields.
+        
+        Cheaper than save_agent for heartbeats, which touch a handful of hot
+        fields (last_seen, status, metrics) on an otherwise unchanged record.
+        
+        Args:
+            agent_id (str): Agent ID
+            fields (dict): Fields to set on the agent record
             
-            # Perform actual save based on time throttling
-            result = self._save_agents(force=False)
-            # print(f"[DEBUG] _save_agents returned: {result}")
-            return result
+        Returns:
+            bool: False if the agent is unknown or the write failed
+        """
+        with self.agent_mutex:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                return False
+            
+            agent.update(fields)
+            self.dirty_agents = True
+            self.agents_revision += 1
+            
+            result = self._append_wal(agent_id, fields, partial=True)
+            snapshot_due = self._wal_records >= self.wal_max_records
+        
+        if snapshot_due:
+            self._save_agents(force=True)
+        return result
+    
+    def touch_agent(self, agent_id, fields):
+        """Update heartbeat fields of an existing agent in memory only.
+        
+        The change reaches disk with the next periodic snapshot. Use update_agent
+        for changes that must survive a crash (status transitions, IOC versions).
+        
+        Args:
+            agent_id (str): Agent ID
+            fields (dict): Fields to set on the agent record
+            
+        Returns:
+            bool: False if the agent is unknown
+        """
+        with self.agent_mutex:
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                return False
+            
+            agent.update(fields)
+            self.dirty_agents = True
+            return True
     
     def force_save(self):
         """Force save any pending changes."""
-        return self._save_agents(force=True) 
\ No newline at end of file
+        matches_saved = self._flush_ioc_matches()
+        return self._save_agents(force=True) and matches_saved 
\ No newline at end of file
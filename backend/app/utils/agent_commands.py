@@ -7,8 +7,10 @@ import logging
 import time
 import uuid
 import grpc
+from flask import current_app, has_app_context
 from app.config.config import config
 from app.grpc import agent_pb2, agent_pb2_grpc
+from app.utils.json_utils import json_loads
 import json
 import threading
 
@@ -22,6 +24,10 @@ def create_grpc_client():
     """Create a gRPC client for command services."""
     # Path to the server certificate
     cert_path = config.GRPC_SERVER_CERT
+    options = [
+        ('grpc.max_send_message_length', config.GRPC_MAX_MESSAGE_SIZE),
+        ('grpc.max_receive_message_length', config.GRPC_MAX_MESSAGE_SIZE)
+    ]
     
     if os.path.exists(cert_path):
         with open(cert_path, 'rb') as f:
@@ -29,12 +35,12 @@ def create_grpc_client():
         
         # Create SSL credentials with the server certificate
         creds = grpc.ssl_channel_credentials(root_certificates=server_cert)
-        channel = grpc.secure_channel('localhost:50051', creds)
+        channel = grpc.secure_channel('localhost:50051', creds, options=options)
         logger.info("Created secure gRPC channel with server certificate")
     else:
         # Fall back to insecure channel if certificate not found
         logger.warning(f"Server certificate not found at {cert_path}, using insecure channel")
-        channel = grpc.insecure_channel('localhost:50051')
+        channel = grpc.insecure_channel('localhost:50051', options=options)
     
     return agent_pb2_grpc.EDRServiceStub(channel)
 
@@ -51,17 +57,36 @@ def send_command_to_agent(agent_id, command_type, params=None, priority=1, timeo
     Returns:
         tuple: (success, message, command_id)
     """
-    if params is None:
-        params = {}
-    
     # Check if agent exists before sending command
     online_agents = get_online_agents()
     if agent_id not in online_agents:
         return False, f"Agent with ID {agent_id} does not exist or is not online", None
     
+    return queue_command(agent_id, command_type, params, priority, timeout)
+
+def queue_command(agent_id, command_type, params=None, priority=1, timeout=60, client=None):
+    """Send a command to an agent without checking that it is online first.
+    
+    For callers that already resolved the online agents, e.g. a fan-out to all of them.
+    
+    Args:
+        agent_id (str): Agent ID
+        command_type (int): Command type enum value
+        params (dict, optional): Command parameters. Defaults to None.
+        priority (int, optional): Command priority. Defaults to 1.
+        timeout (int, optional): Command timeout in seconds. Defaults to 60.
+        client (EDRServiceStub, optional): Stub to reuse; a new one is created if not given
+        
+    Returns:
+        tuple: (success, message, command_id)
+    """
+    if params is None:
+        params = {}
+    
     try:
         # Create gRPC client
-        client = create_grpc_client()
+        if client is None:
+            client = create_grpc_client()
         
         # Create command
         command_id = str(uuid.uuid4())
@@ -87,6 +112,26 @@ def send_command_to_agent(agent_id, command_type, params=None, priority=1, timeo
         logger.error(f"Error sending command to agent {agent_id}: {e}")
         return False, str(e), None
 
+def load_agents():
+    """Get all agents keyed by agent ID.
+    
+    Uses the gRPC servicer's in-memory storage when it runs in this app; it
+    includes status changes and heartbeats not yet snapshotted to agents.json.
+    Otherwise falls back to reading agents.json.
+    
+    Returns:
+        dict: Agent ID -> agent data, or None if no agent data exists yet
+    """
+    storage = current_app.config.get('agent_storage') if has_app_context() else None
+    if storage is not None:
+        return storage.get_all_agents()
+    
+    agents_file = os.path.join(config.DATA_DIR, 'agents.json')
+    if not os.path.exists(agents_file):
+        return None
+    with open(agents_file, 'rb') as f:
+        return json_loads(f.read())
+
 def get_online_agents():
     """Get a list of online agent IDs.
     
@@ -97,14 +142,11 @@ def get_online_agents():
         # Use lock to prevent race conditions when reading agent data
         with agent_data_lock:
             # Get list of agents
-            agents_file = os.path.join(config.DATA_DIR, 'agents.json')
-            if not os.path.exists(agents_file):
+            agents_data = load_agents()
+            if agents_data is None:
                 logger.warning("No agents file found")
                 return []
             
-            with open(agents_file, 'r') as f:
-                agents_data = json.load(f)
-            
             # Filter for online agents
             online_agents = []
             for agent_id, agent in agents_data.items():
@@ -0,0 +1,36 @@
+"""
+JSON helpers for on-disk data, using orjson when it is installed.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_dumps(data, pretty=False):
+    """Serialize data to JSON bytes.
+    
+    Args:
+        data: JSON-serializable data
+        pretty (bool): Indent the output for reading by hand
+    
+    Returns:
+        bytes: Compact JSON, or indented JSON if pretty is set
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def json_loads(data):
+    """Parse JSON from bytes or str.
+    
+    Raises:
+        json.JSONDecodeError: If the data is not valid JSON (orjson's error subclasses it)
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
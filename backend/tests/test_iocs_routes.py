@@ -0,0 +1,40 @@
+import importlib
+
+import pytest
+from flask import Flask
+
+from app.iocs import IOCManager
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The routes module creates its IOC manager under ./data on import
+    monkeypatch.chdir(tmp_path)
+    iocs_routes = importlib.import_module('app.api.routes.iocs')
+    manager = IOCManager(storage_dir=str(tmp_path / 'iocs'), flush_delay=0)
+    monkeypatch.setattr(iocs_routes, 'ioc_manager', manager)
+
+    app = Flask(__name__)
+    app.register_blueprint(iocs_routes.iocs_bp)
+    yield app.test_client(), manager
+    manager.flush()
+
+
+def test_add_ip_rejects_numeric_value(client):
+    test_client, manager = client
+
+    response = test_client.post('/iocs/ip', json={'value': 12345})
+
+    assert response.status_code == 400
+    assert manager.iocs['ip_addresses'] == {}
+    # The IOC list must still serialize after the rejected request
+    assert test_client.get('/iocs').status_code == 200
+
+
+def test_add_ip_accepts_dotted_quad(client):
+    test_client, manager = client
+
+    response = test_client.post('/iocs/ip', json={'value': '10.0.0.1'})
+
+    assert response.status_code == 200
+    assert '10.0.0.1' in manager.iocs['ip_addresses']